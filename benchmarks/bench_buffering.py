@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from .stubs import StubVAD, StubWebSocket, create_client, split_frames, synthetic_speech
+
+
+async def process_audio_dispatch(seconds=30):
+    """
+    Time spent in SilenceAtEndOfChunk.process_audio per received frame,
+    including the creation of a processing task for each full chunk. The
+    tasks themselves run outside the measured time.
+    """
+    frames = split_frames(synthetic_speech(seconds))
+    client = create_client()
+    strategy = client.buffering_strategy
+    websocket = StubWebSocket()
+    vad_pipeline = StubVAD()
+
+    elapsed = 0.0
+    for frame in frames:
+        client.append_audio_data(frame)
+        start = time.perf_counter()
+        client.process_audio(websocket, vad_pipeline, None)
+        elapsed += time.perf_counter() - start
+        if strategy.tasks:
+            await asyncio.gather(*strategy.tasks)
+    client.close()
+    return elapsed, len(frames)
+
+
+async def client_buffering(seconds=30):
+    """
+    Cost per frame of Client.append_audio_data, plus the copy of each full
+    chunk to the scratch buffer done by the process_audio call that
+    dispatches it. The other process_audio calls run outside the measured
+    time.
+    """
+    frames = split_frames(synthetic_speech(seconds))
+    client = create_client()
+    strategy = client.buffering_strategy
+    websocket = StubWebSocket()
+    vad_pipeline = StubVAD()
+
+    elapsed = 0.0
+    for frame in frames:
+        start = time.perf_counter()
+        client.append_audio_data(frame)
+        elapsed += time.perf_counter() - start
+
+        if len(client.buffer) >= strategy.chunk_length_in_bytes:
+            start = time.perf_counter()
+            client.process_audio(websocket, vad_pipeline, None)
+            elapsed += time.perf_counter() - start
+            await asyncio.gather(*strategy.tasks)
+        else:
+            client.process_audio(websocket, vad_pipeline, None)
+    client.close()
+    return elapsed, len(frames)
+
+
+BENCHMARKS = {
+    "buffering.process_audio_dispatch": process_audio_dispatch,
+    "client.buffering": client_buffering,
+}
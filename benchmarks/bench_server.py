@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+import websockets
+
+from src.server import Server
+
+from .stubs import StubVAD, StubWebSocket, create_client, split_frames, synthetic_speech
+
+
+class ScriptedWebSocket(StubWebSocket):
+    """
+    Delivers a fixed list of messages, then reports the connection closed.
+    """
+
+    def __init__(self, messages):
+        super().__init__()
+        self.messages = deque(messages)
+
+    async def recv(self):
+        # Let processing tasks run, as waiting for the network would
+        await asyncio.sleep(0)
+        if not self.messages:
+            raise websockets.ConnectionClosed(None, None)
+        return self.messages.popleft()
+
+
+async def handle_audio(seconds=30):
+    """
+    Time per message in Server.handle_audio for a config message followed
+    by `seconds` of audio frames, with stub VAD and ASR pipelines.
+    """
+    client = create_client()
+    server = Server(StubVAD(), None, client.scheduler)
+    config = {"type": "config", "data": dict(client.config)}
+    messages = [json.dumps(config)] + split_frames(synthetic_speech(seconds))
+    websocket = ScriptedWebSocket(messages)
+
+    start = time.perf_counter()
+    try:
+        await server.handle_audio(client, websocket)
+    except websockets.ConnectionClosed:
+        pass
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*client.pending_tasks())
+    client.close()
+    return elapsed, len(messages)
+
+
+BENCHMARKS = {
+    "server.handle_audio": handle_audio,
+}
@@ -0,0 +1,37 @@
+import time
+
+from src.transcriber.transcriber import Transcriber
+
+from .stubs import synthetic_speech
+
+
+class CountingWriter:
+    """
+    Receives an encoded request body, like aiohttp's stream writer.
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    async def write(self, data):
+        self.size += len(data)
+
+
+async def multipart_encoding(seconds=10, requests=200):
+    """
+    Time to build and serialize the multipart form Transcriber posts for
+    `seconds` of audio, without any network I/O.
+    """
+    audio = synthetic_speech(seconds)
+    writer = CountingWriter()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        payload = Transcriber.form_data(audio)()
+        await payload.write(writer)
+    return time.perf_counter() - start, requests
+
+
+BENCHMARKS = {
+    "transcriber.multipart_encoding": multipart_encoding,
+}
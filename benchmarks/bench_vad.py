@@ -0,0 +1,98 @@
+import time
+
+import torch.nn.functional as F
+
+from src.vad.pyannote_vad import PyannoteVAD
+
+from .stubs import SAMPLING_RATE, synthetic_speech
+
+
+class StubSegment:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+class StubAnnotation:
+    def __init__(self, segments):
+        self.segments = segments
+
+    def __len__(self):
+        return len(self.segments)
+
+    def itersegments(self):
+        return iter(self.segments)
+
+
+class StubSegmentation:
+    """
+    Stands in for pyannote's VoiceActivityDetection pipeline. It slides
+    windows over the waveform like pyannote's inference does, and replaces
+    the segmentation model with an energy threshold per window.
+
+    Attributes:
+        duration (float): Window duration in seconds.
+        step (float): Step between windows in seconds.
+        threshold (float): Mean energy above which a window is speech.
+    """
+
+    def __init__(self, duration=5.0, step=0.5, threshold=1e-3):
+        self.duration = duration
+        self.step = step
+        self.threshold = threshold
+
+    def __call__(self, file):
+        waveform = file["waveform"]
+        sample_rate = file["sample_rate"]
+        window = int(self.duration * sample_rate)
+        step = int(self.step * sample_rate)
+
+        num_samples = waveform.shape[1]
+        padding = max(window - num_samples, 0)
+        if num_samples > window:
+            padding = (step - (num_samples - window) % step) % step
+        chunks = F.pad(waveform, (0, padding)).unfold(1, window, step)
+        energy = chunks.pow(2).mean(dim=-1)[0]
+
+        segments = [
+            StubSegment(i * self.step, i * self.step + self.duration)
+            for i, value in enumerate(energy.tolist())
+            if value > self.threshold
+        ]
+        return StubAnnotation(segments)
+
+
+async def pyannote_to_waveform(seconds=10, calls=200):
+    """
+    Time per int16 to float conversion of `seconds` of audio, the part of
+    PyannoteVAD.detect_activity that does not depend on the model.
+    """
+    buffer = bytearray(synthetic_speech(seconds, SAMPLING_RATE))
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        PyannoteVAD.to_waveform(buffer)
+    return time.perf_counter() - start, calls
+
+
+async def pyannote_detect_activity(seconds=10, calls=50):
+    """
+    Time per PyannoteVAD.detect_activity call on `seconds` of audio: the
+    conversion, the thread hop and the windowing, with the segmentation
+    model stubbed out. The stubbed windowing dominates; see
+    pyannote_to_waveform for the conversion alone.
+    """
+    vad = PyannoteVAD.__new__(PyannoteVAD)
+    vad.vad_pipeline = StubSegmentation()
+    buffer = bytearray(synthetic_speech(seconds, SAMPLING_RATE))
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await vad.detect_activity(buffer)
+    return time.perf_counter() - start, calls
+
+
+BENCHMARKS = {
+    "pyannote_vad.to_waveform": pyannote_to_waveform,
+    "pyannote_vad.detect_activity": pyannote_detect_activity,
+}
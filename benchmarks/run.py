@@ -0,0 +1,217 @@
+"""
+Runs the component microbenchmarks and compares them with a baseline.
+
+    python -m benchmarks.run                    # compare with the baseline
+    python -m benchmarks.run --update-baseline  # record a new baseline
+    python -m benchmarks.run --filter buffering
+    python -m benchmarks.run --ci               # also fail without baseline
+
+Each benchmark drives one hot path with synthetic audio and stub models and
+reports the time per operation. The best of several repeats is compared
+with benchmarks/baseline.json; a benchmark slower than its baseline times
+its tolerance is a regression, and the run exits with status 1.
+
+Timings depend on the machine, so no baseline is kept in the repository:
+record one with --update-baseline on the machine the comparisons run on.
+Benchmarks whose dependencies cannot be imported are skipped. With --ci, a
+missing baseline, a benchmark without baseline entry or a skipped
+benchmark module fails the run too, so that a CI job cannot pass without
+comparing anything.
+
+In CI, the baseline is an artifact of the main branch, recorded on the
+same runner type as the comparisons:
+
+    # on pushes to main, after the tests pass
+    python -m benchmarks.run --update-baseline
+    # then upload benchmarks/baseline.json as the "benchmark-baseline"
+    # artifact
+
+    # on pull requests, download the latest "benchmark-baseline" artifact
+    # of main to benchmarks/baseline.json, then
+    python -m benchmarks.run --ci
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import statistics
+
+MODULES = [
+    "benchmarks.bench_buffering",
+    "benchmarks.bench_vad",
+    "benchmarks.bench_transcriber",
+    "benchmarks.bench_server",
+]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Allowed slowdown relative to the baseline before a run fails
+DEFAULT_TOLERANCE = 1.25
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Component microbenchmarks with regression thresholds"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=DEFAULT_BASELINE,
+        help="JSON file holding the baseline timings and tolerances",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the measured timings as the new baseline",
+    )
+    parser.add_argument(
+        "--ci",
+        action="store_true",
+        help="Fail when the baseline is missing or incomplete, or when "
+        "benchmarks are skipped",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Runs of each benchmark; the fastest is kept",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default=None,
+        help="Only run benchmarks whose name contains this string",
+    )
+    return parser.parse_args()
+
+
+def load_benchmarks():
+    """
+    Imports the benchmark modules.
+
+    Returns:
+        tuple: The benchmarks by name, and the names of the modules skipped
+               because of missing dependencies.
+    """
+    benchmarks = {}
+    skipped = []
+    for name in MODULES:
+        try:
+            module = importlib.import_module(name)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+            skipped.append(name)
+            continue
+        benchmarks.update(module.BENCHMARKS)
+    return benchmarks, skipped
+
+
+def measure(benchmark, repeats):
+    """
+    Runs a benchmark `repeats` times, after one warm-up run.
+
+    Args:
+        benchmark (callable): Coroutine function returning the elapsed
+                              seconds and the number of operations timed.
+        repeats (int): Number of measured runs.
+
+    Returns:
+        dict: The fastest and median time per operation, in nanoseconds.
+    """
+    asyncio.run(benchmark())
+    per_op = []
+    for _ in range(repeats):
+        elapsed, operations = asyncio.run(benchmark())
+        per_op.append(elapsed / operations * 1e9)
+    return {"per_op_ns": min(per_op), "median_ns": statistics.median(per_op)}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, baseline, results):
+    for name, result in results.items():
+        entry = baseline["benchmarks"].setdefault(name, {})
+        entry["per_op_ns"] = round(result["per_op_ns"], 1)
+    baseline["machine"] = {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def compare(name, result, baseline):
+    """
+    Checks a result against its baseline entry.
+
+    Returns:
+        tuple: The status to print, and whether it is a regression.
+    """
+    entry = baseline["benchmarks"].get(name)
+    if entry is None or "per_op_ns" not in entry:
+        return "no baseline", False
+    tolerance = entry.get("tolerance", baseline.get("tolerance", DEFAULT_TOLERANCE))
+    ratio = result["per_op_ns"] / entry["per_op_ns"]
+    if ratio > tolerance:
+        return f"REGRESSION x{ratio:.2f} (limit x{tolerance:.2f})", True
+    return f"ok x{ratio:.2f}", False
+
+
+def main():
+    args = parse_args()
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        if args.ci and not args.update_baseline:
+            print(
+                f"No baseline at {args.baseline}: restore the main branch "
+                "artifact, or record one with --update-baseline"
+            )
+            raise SystemExit(1)
+        baseline = {"tolerance": DEFAULT_TOLERANCE, "benchmarks": {}}
+    elif "machine" in baseline and not args.update_baseline:
+        machine = baseline["machine"]
+        print(
+            f"Baseline recorded on {machine['platform']}, "
+            f"Python {machine['python']}"
+        )
+
+    benchmarks, skipped = load_benchmarks()
+    results = {}
+    failures = [f"{name} skipped" for name in skipped] if args.ci else []
+    for name, benchmark in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = measure(benchmark, args.repeats)
+        results[name] = result
+        status, regressed = compare(name, result, baseline)
+        if regressed:
+            failures.append(name)
+        elif args.ci and status == "no baseline":
+            failures.append(f"{name} has no baseline")
+        print(
+            f"{name:<36} {result['per_op_ns']:>12.1f} ns/op "
+            f"(median {result['median_ns']:.1f})  {status}"
+        )
+
+    if args.update_baseline:
+        save_baseline(args.baseline, baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if failures:
+        print(f"{len(failures)} failure(s): {', '.join(failures)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import array
+import math
+
+from tests.stubs import (  # noqa: F401
+    SAMPLES_WIDTH,
+    SAMPLING_RATE,
+    StubVAD,
+    StubWebSocket,
+    create_client,
+)
+
+# The browser client posts one 128 sample AudioWorklet block at 48 kHz per
+# message, which becomes 43 samples once resampled to 16 kHz
+FRAME_BYTES = 43 * SAMPLES_WIDTH
+
+
+def synthetic_speech(seconds, sampling_rate=SAMPLING_RATE):
+    """
+    Generates int16 audio alternating half a second of a modulated tone,
+    standing in for speech, with half a second of silence.
+
+    Args:
+        seconds (float): Duration of the audio.
+        sampling_rate (int): The sampling rate of the audio in Hz.
+
+    Returns:
+        bytes: Mono 16 bit PCM audio.
+    """
+    samples = array.array("h", bytes(int(seconds * sampling_rate) * 2))
+    for i in range(len(samples)):
+        t = i / sampling_rate
+        if int(t * 2) % 2 == 0:
+            envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)
+            samples[i] = int(12000 * envelope * math.sin(2 * math.pi * 220 * t))
+    return samples.tobytes()
+
+
+def split_frames(audio, frame_bytes=FRAME_BYTES):
+    return [audio[i : i + frame_bytes] for i in range(0, len(audio), frame_bytes)]
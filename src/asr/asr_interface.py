@@ -1,9 +1,11 @@
 class ASRInterface:
-    async def transcribe(self, buffer):
+    async def transcribe(self, buffer, language=None):
         """
         Transcribe the given audio data.
 
         :param buffer: The audio buffer
+        :param language: Optional language code; when None the backend
+                         detects the language itself.
         :return: The transcription structure, see for example the
                  faster_whisper_asr.py file.
         """
@@ -26,3 +26,73 @@ async def save_audio_to_file(
         wav_file.writeframes(audio_data)
 
     return file_path
+
+
+def compact_speech(
+    audio_data,
+    segments,
+    sampling_rate=16000,
+    samples_width=2,
+    padding_seconds=0.2,
+    max_gap_seconds=0.5,
+):
+    """
+    Keeps only the speech regions of the audio data.
+
+    Each VAD segment is padded on both sides; leading and trailing silence
+    is dropped and pauses between segments are shortened to at most
+    max_gap_seconds.
+
+    :param audio_data: The audio data to compact.
+    :param segments: VAD segments, dicts with "start" and "end" in seconds.
+    :param sampling_rate: The sampling rate of the audio data in Hz.
+    :param samples_width: The width of each audio sample in bytes.
+    :param padding_seconds: Silence kept around each segment.
+    :param max_gap_seconds: Longest pause kept between two segments.
+    :return: The compacted audio and a mapping, a list of
+             (compacted_start, original_start) pairs in seconds for each
+             kept span, to use with map_to_original.
+    """
+    bytes_per_second = sampling_rate * samples_width
+    total_seconds = len(audio_data) / bytes_per_second
+
+    spans = []
+    for segment in segments:
+        start = max(segment["start"] - padding_seconds, 0.0)
+        end = min(segment["end"] + padding_seconds, total_seconds)
+        if spans and start - spans[-1][1] <= max_gap_seconds:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            if spans:
+                # Keep part of a long pause so words stay separated
+                spans[-1][1] += max_gap_seconds
+            spans.append([start, end])
+
+    compacted = bytearray()
+    mapping = []
+    for start, end in spans:
+        start_byte = int(start * sampling_rate) * samples_width
+        end_byte = int(end * sampling_rate) * samples_width
+        mapping.append(
+            (len(compacted) / bytes_per_second, start_byte / bytes_per_second)
+        )
+        compacted += audio_data[start_byte:end_byte]
+
+    return compacted, mapping
+
+
+def map_to_original(seconds, mapping):
+    """
+    Translates a time in audio compacted by compact_speech back to the
+    original audio.
+
+    :param seconds: Time in the compacted audio.
+    :param mapping: The mapping returned by compact_speech.
+    :return: The corresponding time in the original audio.
+    """
+    compacted_start, original_start = 0.0, 0.0
+    for span in mapping:
+        if span[0] > seconds:
+            break
+        compacted_start, original_start = span
+    return original_start + seconds - compacted_start
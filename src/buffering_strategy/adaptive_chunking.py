@@ -0,0 +1,82 @@
+import statistics
+from collections import deque
+
+
+class AdaptiveChunkTuner:
+    """
+    Picks chunk length and offset for SilenceAtEndOfChunk from current load.
+
+    Under light load the lower bounds are used, so utterances are finalized
+    as soon as possible. Under heavy load values move towards the upper
+    bounds: larger chunks mean fewer VAD passes, and waiting for a longer
+    pause means fewer, longer utterances and so fewer model invocations. At
+    the heavy end the offset is set to the speaker's 90th percentile pause
+    within speech, so that most of their pauses do not split an utterance.
+
+    Attributes:
+        min_chunk_length_seconds (float): Chunk length under light load.
+        max_chunk_length_seconds (float): Chunk length under heavy load.
+        min_chunk_offset_seconds (float): Chunk offset under light load.
+        max_chunk_offset_seconds (float): Upper bound of the chunk offset.
+        light_load (float): Load at or below which lower bounds are used.
+        heavy_load (float): Load at or above which upper bounds are used.
+        pauses (deque): Recent pauses between speech segments, in seconds.
+    """
+
+    def __init__(
+        self,
+        min_chunk_length_seconds,
+        max_chunk_length_seconds,
+        min_chunk_offset_seconds,
+        max_chunk_offset_seconds,
+        light_load=0.5,
+        heavy_load=2.0,
+        pause_history=50,
+    ):
+        self.min_chunk_length_seconds = min_chunk_length_seconds
+        self.max_chunk_length_seconds = max_chunk_length_seconds
+        self.min_chunk_offset_seconds = min_chunk_offset_seconds
+        self.max_chunk_offset_seconds = max_chunk_offset_seconds
+        self.light_load = light_load
+        self.heavy_load = heavy_load
+        self.pauses = deque(maxlen=pause_history)
+
+    def observe_pauses(self, vad_results):
+        """
+        Records the pauses between consecutive segments of an utterance.
+
+        Args:
+            vad_results (list): VAD segments with "start" and "end" keys.
+        """
+        for previous, current in zip(vad_results, vad_results[1:]):
+            self.pauses.append(current["start"] - previous["end"])
+
+    def heavy_chunk_offset_seconds(self):
+        if len(self.pauses) < 2:
+            return self.max_chunk_offset_seconds
+        long_pause = statistics.quantiles(self.pauses, n=10)[-1]
+        return min(
+            max(long_pause, self.min_chunk_offset_seconds),
+            self.max_chunk_offset_seconds,
+        )
+
+    def tune(self, load):
+        """
+        Returns the chunk length and offset to use under the given load.
+
+        Args:
+            load (float): Backend load, see TranscriptionScheduler.load().
+
+        Returns:
+            tuple: chunk_length_seconds and chunk_offset_seconds.
+        """
+        fraction = (load - self.light_load) / (self.heavy_load - self.light_load)
+        fraction = min(max(fraction, 0.0), 1.0)
+
+        chunk_length_seconds = self.min_chunk_length_seconds + fraction * (
+            self.max_chunk_length_seconds - self.min_chunk_length_seconds
+        )
+        chunk_offset_seconds = self.min_chunk_offset_seconds + fraction * (
+            self.heavy_chunk_offset_seconds() - self.min_chunk_offset_seconds
+        )
+        return chunk_length_seconds, chunk_offset_seconds
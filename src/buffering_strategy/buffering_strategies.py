@@ -2,33 +2,12 @@ import asyncio
 import json
 import os
 import time
-from typing import Set
 
-from .buffering_strategy_interface import BufferingStrategyInterface
-
-
-class Command:
-    """A command, an asynchronous task, imagine an asynchronous action."""
-
-    async def run(self):
-        """To be defined in sub-classes."""
-        pass
-
-    async def start(self, condition: asyncio.Condition, commands: Set["Command"]):
-        """
-        Start the task, calling run asynchronously.
-
-        This method also keeps track of the running commands.
-
-        """
-        commands.add(self)
-        await self.run()
-        commands.remove(self)
+from src.audio_utils import compact_speech, map_to_original
+from src.tracing import current_trace, finish_trace, span, start_trace
 
-        # At this point, we should ask the condition to update
-        # as the number of running commands might have reached 0.
-        async with condition:
-            condition.notify()
+from .adaptive_chunking import AdaptiveChunkTuner
+from .buffering_strategy_interface import BufferingStrategyInterface
 
 
 class SilenceAtEndOfChunk(BufferingStrategyInterface):
@@ -46,6 +25,27 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
         chunk_length_seconds (float): Length of each audio chunk in seconds.
         chunk_offset_seconds (float): Offset time in seconds to be considered
                                       for processing audio chunks.
+        tuner (AdaptiveChunkTuner): When adaptive mode is enabled, adjusts
+                                    the chunk length and offset to the
+                                    transcription load; None otherwise.
+        trim_silence (bool): Whether non-speech audio is removed before
+                             transcription.
+        trim_padding_seconds (float): Silence kept around each speech region.
+        trim_max_gap_seconds (float): Longest pause kept inside an utterance.
+        tasks (set): Processing tasks still running for the client.
+        finalized (set): Tasks transcribing an utterance whose end was
+                         found, which no longer need the client's buffers.
+        speculative (bool): Whether transcription starts speculatively at
+                            short pauses.
+        speculative_pause_seconds (float): Pause that starts a speculative
+                                           transcription, or None to use
+                                           half of the chunk offset. It must
+                                           be shorter than the offset,
+                                           which ends the utterance.
+        speculative_max_load (float): Load above which no speculative
+                                      transcription is started.
+        speculative_reuse_prefix (bool): Whether a finished speculative
+                                         result is kept when speech resumes.
     """
 
     def __init__(self, client, transcriber, **kwargs):
@@ -57,9 +57,20 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
                              strategy.
             **kwargs: Additional keyword arguments, including
                       'chunk_length_seconds' and 'chunk_offset_seconds'.
+                      'adaptive' enables load-adaptive tuning within
+                      'min_chunk_length_seconds', 'max_chunk_length_seconds',
+                      'min_chunk_offset_seconds' and
+                      'max_chunk_offset_seconds'. 'trim_silence',
+                      'trim_padding_seconds' and 'trim_max_gap_seconds'
+                      control how audio is compacted before transcription.
+                      'speculative', 'speculative_pause_seconds',
+                      'speculative_max_load' and 'speculative_reuse_prefix'
+                      control speculative transcription at pauses.
         """
         self.client = client
         self.transcriber = transcriber
+        self.tasks = set()
+        self.finalized = set()
 
         self.chunk_length_seconds = os.environ.get("BUFFERING_CHUNK_LENGTH_SECONDS")
         if not self.chunk_length_seconds:
@@ -80,6 +91,62 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
         if not self.error_if_not_realtime:
             self.error_if_not_realtime = kwargs.get("error_if_not_realtime", False)
 
+        self.trim_silence = kwargs.get("trim_silence", True)
+        self.trim_padding_seconds = float(kwargs.get("trim_padding_seconds", 0.2))
+        self.trim_max_gap_seconds = float(kwargs.get("trim_max_gap_seconds", 0.5))
+
+        self.speculative = kwargs.get("speculative", False)
+        self.speculative_pause_seconds = kwargs.get("speculative_pause_seconds")
+        if self.speculative_pause_seconds is not None:
+            self.speculative_pause_seconds = float(self.speculative_pause_seconds)
+            if self.speculative_pause_seconds >= self.chunk_offset_seconds:
+                print(
+                    f"speculative_pause_seconds ({self.speculative_pause_seconds}) "
+                    f"is not shorter than chunk_offset_seconds "
+                    f"({self.chunk_offset_seconds}), so no speculation could "
+                    f"start; using half of the offset instead"
+                )
+                self.speculative_pause_seconds = None
+        self.speculative_max_load = float(kwargs.get("speculative_max_load", 1.0))
+        self.speculative_reuse_prefix = kwargs.get("speculative_reuse_prefix", False)
+
+        adaptive = os.environ.get("BUFFERING_ADAPTIVE")
+        if not adaptive:
+            adaptive = kwargs.get("adaptive", False)
+        self.tuner = None
+        if adaptive and str(adaptive).lower() not in ("0", "false", "no"):
+            self.tuner = AdaptiveChunkTuner(
+                float(
+                    kwargs.get(
+                        "min_chunk_length_seconds", self.chunk_length_seconds / 2
+                    )
+                ),
+                float(
+                    kwargs.get(
+                        "max_chunk_length_seconds", self.chunk_length_seconds * 2
+                    )
+                ),
+                float(
+                    kwargs.get("min_chunk_offset_seconds", self.chunk_offset_seconds)
+                ),
+                float(kwargs.get("max_chunk_offset_seconds", 1.0)),
+            )
+            self.retune()
+
+    def retune(self):
+        """
+        Applies the chunk length and offset suggested by the tuner for the
+        current transcription load.
+        """
+        self.chunk_length_seconds, self.chunk_offset_seconds = self.tuner.tune(
+            self.transcriber.load()
+        )
+        self.chunk_length_in_bytes = (
+            self.chunk_length_seconds
+            * self.client.sampling_rate
+            * self.client.samples_width
+        )
+
     def process_audio(self, websocket, vad_pipeline):
         """
         Process audio chunks by checking their length and scheduling
@@ -103,11 +170,47 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
             )
             return
 
+        # Read before new audio restarts the buffer, as the task may only
+        # start once it has
+        buffer_started_at = self.client.buffer_started_at
+        received_at = time.time()
         self.client.scratch_buffer += self.client.buffer
         self.client.buffer.clear()
 
-        # Schedule the processing in a separate task
-        asyncio.create_task(self.process_audio_async(websocket, vad_pipeline))
+        if self.tuner is not None:
+            self.retune()
+
+        # Schedule the processing in a separate task, tracked so that it can
+        # be cancelled when the client goes away
+        task = asyncio.create_task(
+            self.process_audio_async(
+                websocket, vad_pipeline, buffer_started_at, received_at
+            )
+        )
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        task.add_done_callback(self.finalized.discard)
+
+    def pending_tasks(self):
+        return set(self.tasks)
+
+    def close(self, keep_finalized=False):
+        """
+        Cancel the processing tasks of the client. Their pending
+        transcriptions are withdrawn from the scheduler.
+
+        Args:
+            keep_finalized (bool): Let the utterances already being
+                                   transcribed finish and be sent.
+
+        Returns:
+            set: The tasks left running.
+        """
+        kept = set(self.finalized) if keep_finalized else set()
+        for task in list(self.tasks):
+            if task not in kept:
+                task.cancel()
+        return kept
 
     def get_last_segment_should_end_before(self):
         last_segment_should_end_before = (
@@ -116,7 +219,133 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
         ) - self.chunk_offset_seconds
         return last_segment_should_end_before
 
-    async def process_audio_async(self, websocket, vad_pipeline):
+    @staticmethod
+    def restore_timestamps(transcription, mapping, offset=0.0):
+        """
+        Translates segment and word timestamps of a transcription of
+        compacted audio back to the utterance, starting `offset` seconds in.
+        """
+        items = list(transcription.get("segments") or [])
+        for segment in items[:]:
+            items.extend(segment.get("words") or [])
+        words = transcription.get("words")
+        if isinstance(words, list):
+            items.extend(words)
+        for item in items:
+            for key in ("start", "end"):
+                if isinstance(item.get(key), (int, float)):
+                    item[key] = map_to_original(item[key], mapping) + offset
+
+    @staticmethod
+    def merge_transcriptions(pieces):
+        """
+        Joins the transcriptions of consecutive parts of an utterance.
+        """
+        if len(pieces) == 1:
+            return pieces[0]
+        merged = dict(pieces[-1])
+        merged["text"] = " ".join(
+            piece["text"].strip() for piece in pieces if piece.get("text")
+        )
+        for key in ("segments", "words"):
+            if all(isinstance(piece.get(key), list) for piece in pieces):
+                merged[key] = [item for piece in pieces for item in piece[key]]
+        return merged
+
+    async def transcribe_region(
+        self, audio, offset, vad_results, waited, speculative=False
+    ):
+        """
+        Transcribes part of the utterance.
+
+        Args:
+            audio (bytes): The audio of the part, starting `offset` seconds
+                           into the utterance.
+            offset (float): Start of the part in the utterance, in seconds.
+            vad_results (list): VAD segments of the whole utterance.
+            waited (float): Seconds since the end of the speech.
+            speculative (bool): Whether the result may be thrown away.
+
+        Returns:
+            dict: The transcription, with timestamps relative to the
+                  utterance.
+        """
+        mapping = []
+        if self.trim_silence:
+            segments = [
+                {
+                    "start": max(segment["start"] - offset, 0.0),
+                    "end": segment["end"] - offset,
+                }
+                for segment in vad_results
+                if segment["end"] > offset
+            ]
+            audio, mapping = compact_speech(
+                audio,
+                segments,
+                self.client.sampling_rate,
+                self.client.samples_width,
+                self.trim_padding_seconds,
+                self.trim_max_gap_seconds,
+            )
+
+        language = self.client.language.next_language()
+        transcription = await self.transcriber.transcribe(
+            audio, language, waited=waited, speculative=speculative
+        )
+        self.client.language.observe(language, transcription)
+        self.restore_timestamps(transcription, mapping, offset)
+        return transcription
+
+    def start_speculation(self, vad_results, prefix_length):
+        """
+        Starts transcribing the utterance so far if the speaker has paused
+        long enough and the transcription load leaves room for it.
+
+        Returns:
+            Speculation: The speculative job, or None if none was started.
+        """
+        bytes_per_second = self.client.sampling_rate * self.client.samples_width
+        length = len(self.client.scratch_buffer)
+        trailing_silence = length / bytes_per_second - vad_results[-1]["end"]
+        if (
+            not self.speculative
+            or trailing_silence < self.speculative_pause()
+            or self.transcriber.load() >= self.speculative_max_load
+        ):
+            return None
+
+        task = asyncio.create_task(
+            self.transcribe_region(
+                self.client.scratch_buffer[prefix_length:length],
+                prefix_length / bytes_per_second,
+                vad_results,
+                trailing_silence,
+                speculative=True,
+            )
+        )
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        task.add_done_callback(self.finalized.discard)
+        return Speculation(task, length)
+
+    def speculative_pause(self):
+        if self.speculative_pause_seconds is None:
+            return self.chunk_offset_seconds / 2
+        return self.speculative_pause_seconds
+
+    def speech_resumed(self, speculation, vad_results):
+        # Only speech after the audio the speculation covered counts; VAD
+        # often moves the end of the last segment by a few tens of ms
+        bytes_per_second = self.client.sampling_rate * self.client.samples_width
+        return (
+            len(vad_results) > 0
+            and vad_results[-1]["end"] > speculation.length / bytes_per_second
+        )
+
+    async def process_audio_async(
+        self, websocket, vad_pipeline, buffer_started_at, received_at
+    ):
         """
         Asynchronously process audio for activity detection and transcription.
 
@@ -124,37 +353,117 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
         detection and transcription of the audio data. It sends the
         transcription results through the WebSocket connection.
 
+        In speculative mode, transcription starts at the first short pause.
+        If the pause turns out to end the utterance, that result is sent;
+        if speech resumes, the job is cancelled or, when
+        'speculative_reuse_prefix' is set and it already finished, kept as
+        the transcription of the beginning of the utterance.
+
         Args:
             websocket (Websocket): The WebSocket connection for sending
                                    transcriptions.
             vad_pipeline: The voice activity detection pipeline.
-            asr_pipeline: The automatic speech recognition pipeline.
+            buffer_started_at (float): When the first audio of the chunk was
+                                       received.
+            received_at (float): When the chunk was handed off for
+                                 processing.
         """
 
+        trace = start_trace(self.client.client_id)
+        current_trace.set(trace)
+        if trace is not None:
+            trace.add_span(
+                "receive",
+                buffer_started_at,
+                received_at,
+                bytes=len(self.client.scratch_buffer),
+            )
+        try:
+            await self.finalize_utterance(websocket, vad_pipeline)
+        finally:
+            finish_trace(trace)
+
+    async def detect_activity(self, vad_pipeline, vad_pass):
+        with span("vad", vad_pass=vad_pass, bytes=len(self.client.scratch_buffer)):
+            return await vad_pipeline.detect_activity(self.client.scratch_buffer)
+
+    async def finalize_utterance(self, websocket, vad_pipeline):
+        """
+        Waits for the end of the utterance, transcribes it and sends the
+        transcription.
+        """
+        vad_pass = 0
         last_segment_should_end_before = self.get_last_segment_should_end_before()
-        vad_results = await vad_pipeline.detect_activity(self.client.scratch_buffer)
+        vad_results = await self.detect_activity(vad_pipeline, vad_pass)
 
         if len(vad_results) == 0:
             self.client.scratch_buffer.clear()
             return
 
         talk_start = time.time()
+        pieces = []
+        prefix_length = 0
+        speculation = None
         while (
             len(vad_results) == 0
             or vad_results[-1]["end"] > last_segment_should_end_before
         ):
+            if speculation is None and len(vad_results) > 0:
+                speculation = self.start_speculation(vad_results, prefix_length)
             await asyncio.sleep(1)
             self.client.scratch_buffer += self.client.buffer
             self.client.buffer.clear()
             last_segment_should_end_before = self.get_last_segment_should_end_before()
-            vad_results = await vad_pipeline.detect_activity(self.client.scratch_buffer)
+            vad_pass += 1
+            vad_results = await self.detect_activity(vad_pipeline, vad_pass)
+            if speculation is not None and self.speech_resumed(
+                speculation, vad_results
+            ):
+                if self.speculative_reuse_prefix and speculation.succeeded():
+                    pieces.append(speculation.task.result())
+                    prefix_length = speculation.length
+                else:
+                    speculation.task.cancel()
+                speculation = None
 
         talk_end = time.time()
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_span("finalize", talk_start, talk_end, vad_passes=vad_pass + 1)
+        if self.tuner is not None:
+            self.tuner.observe_pauses(vad_results)
         start = time.time()
-        copy = self.client.scratch_buffer.copy()
+        bytes_per_second = self.client.sampling_rate * self.client.samples_width
+        # Seconds of trailing silence, i.e. how long the speech already waited
+        speech_end = vad_results[-1]["end"]
+        waited = len(self.client.scratch_buffer) / bytes_per_second - speech_end
+        if speculation is not None and (
+            not speculation.task.done() or speculation.succeeded()
+        ):
+            # The utterance ended at the pause, so the job is no longer
+            # speculative
+            self.transcriber.promote()
+            pending = speculation.task
+        elif pieces and speech_end <= prefix_length / bytes_per_second:
+            # No speech after the part already transcribed
+            pending = None
+        else:
+            pending = self.transcribe_region(
+                self.client.scratch_buffer[prefix_length:],
+                prefix_length / bytes_per_second,
+                vad_results,
+                waited,
+            )
         self.client.scratch_buffer.clear()
-
-        transcription = await self.transcriber.transcribe(copy)
+        # The audio has been handed over, so a config change can let the
+        # transcription finish
+        self.finalized.add(asyncio.current_task())
+        if isinstance(pending, asyncio.Task):
+            self.finalized.add(pending)
+
+        if pending is not None:
+            pieces.append(await pending)
+        transcription = self.merge_transcriptions(pieces)
         if transcription["text"] != "":
             end = time.time()
             transcription["processing_time"] = end - start
@@ -162,4 +471,26 @@ class SilenceAtEndOfChunk(BufferingStrategyInterface):
             print(
                 f"{len(transcription['text'].split(' '))} words, {talk_end - talk_start} seconds, in {transcription['processing_time']} seconds"
             )
-            await websocket.send(json_transcription)
+            with span("send", bytes=len(json_transcription)):
+                await websocket.send(json_transcription)
+
+
+class Speculation:
+    """
+    A transcription started at a pause that may not end the utterance.
+
+    Attributes:
+        task (asyncio.Task): The transcription.
+        length (int): Length in bytes of the utterance audio it covers.
+    """
+
+    def __init__(self, task, length):
+        self.task = task
+        self.length = length
+
+    def succeeded(self):
+        return (
+            self.task.done()
+            and not self.task.cancelled()
+            and self.task.exception() is None
+        )
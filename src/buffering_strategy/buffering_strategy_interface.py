@@ -13,6 +13,8 @@ class BufferingStrategyInterface:
     Methods:
         process_audio: Process audio data. This method should be implemented
                        by subclasses.
+        close: Cancel any work still running for the client.
+        pending_tasks: The work still running for the client.
     """
 
     def process_audio(self, websocket, vad_pipeline):
@@ -37,3 +39,27 @@ class BufferingStrategyInterface:
                                  subclass.
         """
         raise NotImplementedError("This method should be implemented by subclasses.")
+
+    def close(self, keep_finalized=False):
+        """
+        Cancel any asynchronous work started by process_audio.
+
+        Called when the client disconnects or replaces its buffering strategy,
+        so that no compute is spent on results nobody will receive.
+
+        Args:
+            keep_finalized (bool): Let utterances whose audio is already
+                                   being transcribed finish and send their
+                                   transcription.
+
+        Returns:
+            set: The tasks left running.
+        """
+        return set()
+
+    def pending_tasks(self):
+        """
+        Return the asynchronous tasks started by process_audio that have not
+        finished yet, so that a graceful shutdown can wait for them.
+        """
+        return set()
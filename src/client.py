@@ -1,9 +1,16 @@
 # isort: skip_file
 
+import contextvars
+import time
+
 from src.buffering_strategy.buffering_strategy_factory import (
     BufferingStrategyFactory,
 )
-from src.transcriber.transcriber import Transcriber
+from src.transcriber.session_language import SessionLanguage
+
+# ID of the client on whose behalf the current task runs, so that work
+# handed to remote workers can be routed back to it
+current_session_id = contextvars.ContextVar("current_session_id", default=None)
 
 
 class Client:
@@ -24,12 +31,24 @@ class Client:
                              client.
         sampling_rate (int): The sampling rate of the audio data in Hz.
         samples_width (int): The width of each audio sample in bits.
+        scheduler (TranscriptionScheduler): Shared scheduler the client's
+                                            transcriptions are queued on. The
+                                            optional "tenant" and "priority"
+                                            config keys select the priority.
+        buffer_started_at (float): When the first audio now in the buffer
+                                   was received.
+        language (SessionLanguage): Tracks the language to request from the
+                                    ASR backend for this session.
+        finishing (set): Transcriptions started by replaced buffering
+                         strategies, still to be sent.
     """
 
-    def __init__(self, client_id, sampling_rate, samples_width):
+    def __init__(self, client_id, sampling_rate, samples_width, scheduler):
         self.client_id = client_id
         self.buffer = bytearray()
+        self.buffer_started_at = time.time()
         self.scratch_buffer = bytearray()
+        self.finishing = set()
         self.config = {
             "language": None,
             "processing_strategy": "silence_at_end_of_chunk",
@@ -40,28 +59,59 @@ class Client:
         }
         self.sampling_rate = sampling_rate
         self.samples_width = samples_width
+        self.scheduler = scheduler
+        self.language = SessionLanguage(self.config["language"])
         self.buffering_strategy = BufferingStrategyFactory.create_buffering_strategy(
             self.config["processing_strategy"],
             self,
-            Transcriber(
-                "http://ip-172-31-22-183.eu-west-1.compute.internal:8080/v1/audio/transcriptions"
+            self.scheduler.for_client(
+                self.client_id,
+                tenant=self.config.get("tenant"),
+                priority=self.config.get("priority"),
             ),
             **self.config["processing_args"],
         )
 
     def update_config(self, config_data):
+        language = self.config["language"]
         self.config.update(config_data)
+        # Utterances already being transcribed are finished and sent; the
+        # cancelled one goes back to the buffer, to be processed again with
+        # the new config
+        for task in self.buffering_strategy.close(keep_finalized=True):
+            self.finishing.add(task)
+            task.add_done_callback(self.finishing.discard)
+        self.buffer[:0] = self.scratch_buffer
+        self.scratch_buffer.clear()
+        # Other settings keep the language detected so far
+        if self.config["language"] != language:
+            self.language = SessionLanguage(self.config["language"])
         self.buffering_strategy = BufferingStrategyFactory.create_buffering_strategy(
             self.config["processing_strategy"],
             self,
-            Transcriber(
-                "http://ip-172-31-22-183.eu-west-1.compute.internal:8080/v1/audio/transcriptions"
+            self.scheduler.for_client(
+                self.client_id,
+                tenant=self.config.get("tenant"),
+                priority=self.config.get("priority"),
             ),
             **self.config["processing_args"],
         )
 
     def append_audio_data(self, audio_data):
+        if not self.buffer:
+            self.buffer_started_at = time.time()
         self.buffer.extend(audio_data)
 
     def process_audio(self, websocket, vad_pipeline, asr_pipeline):
+        current_session_id.set(self.client_id)
         self.buffering_strategy.process_audio(websocket, vad_pipeline)
+
+    def pending_tasks(self):
+        return self.buffering_strategy.pending_tasks() | self.finishing
+
+    def close(self):
+        self.buffering_strategy.close()
+        for task in list(self.finishing):
+            task.cancel()
+        self.buffer.clear()
+        self.scratch_buffer.clear()
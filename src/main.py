@@ -1,10 +1,28 @@
+# isort: skip_file
+
 import argparse
 import asyncio
 import json
 import logging
+import signal
 
+from src import tracing
 from src.asr.asr_factory import ASRFactory
+from src.reloadable import (
+    PipelineReloader,
+    ReloadablePipeline,
+    reload_pipelines,
+)
+from src.scheduler.transcription_scheduler import TranscriptionScheduler
+from src.transcriber.transcriber import Transcriber
 from src.vad.vad_factory import VADFactory
+from src.work_queue.remote_pipelines import (
+    RemoteDispatcher,
+    RemoteTranscriber,
+    RemoteVAD,
+)
+from src.work_queue.work_queue_factory import WorkQueueFactory
+from src.work_queue.worker import Worker
 
 from .server import Server
 
@@ -38,6 +56,99 @@ def parse_args():
         default='{"model_size": "large-v3"}',
         help="JSON string of additional arguments for ASR pipeline",
     )
+    parser.add_argument(
+        "--transcriber-url",
+        type=str,
+        default="http://ip-172-31-22-183.eu-west-1.compute.internal:8080/v1/audio/transcriptions",
+        help="URL of the HTTP transcription service; pass an empty string to "
+        "transcribe with the local ASR pipeline instead",
+    )
+    parser.add_argument(
+        "--scheduler-args",
+        type=str,
+        default='{"max_latency_seconds": 5.0}',
+        help="JSON string of arguments for the transcription scheduler, "
+        "e.g. max_concurrency, max_latency_seconds, tenant_priorities. "
+        "max_concurrency defaults to 2 with the local ASR pipeline and to "
+        "no limit otherwise",
+    )
+    parser.add_argument(
+        "--role",
+        type=str,
+        default="all",
+        choices=["all", "gateway", "worker"],
+        help="Run the WebSocket gateway, the ASR/VAD worker, or both. "
+        "gateway and worker require --queue-type. default: all",
+    )
+    parser.add_argument(
+        "--queue-type",
+        type=str,
+        default=None,
+        choices=["in_process", "socket", "redis"],
+        help="Work queue connecting the gateway and the workers. Without it, "
+        "the 'all' role calls the pipelines directly",
+    )
+    parser.add_argument(
+        "--queue-args",
+        type=str,
+        default="{}",
+        help="JSON string of additional arguments for the work queue",
+    )
+    parser.add_argument(
+        "--worker-concurrency",
+        type=int,
+        default=4,
+        help="Number of jobs a worker processes at once",
+    )
+    parser.add_argument(
+        "--session-grace-seconds",
+        type=float,
+        default=30.0,
+        help="How long the state of a resumable session is kept after its "
+        "connection drops",
+    )
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        default=None,
+        help="File to append per-utterance traces to; tracing is disabled "
+        "without it",
+    )
+    parser.add_argument(
+        "--trace-format",
+        type=str,
+        default="jsonl",
+        choices=["jsonl", "otlp"],
+        help="Format of the trace file: one JSON object per trace, or "
+        "OTLP/JSON export requests. default: jsonl",
+    )
+    parser.add_argument(
+        "--trace-sample-rate",
+        type=float,
+        default=1.0,
+        help="Fraction of utterances to trace",
+    )
+    parser.add_argument(
+        "--admin-token",
+        type=str,
+        default=None,
+        help="Token enabling the /admin/ endpoints, such as /admin/profile",
+    )
+    parser.add_argument(
+        "--reload-config",
+        type=str,
+        default=None,
+        help="JSON file read when reloading the pipelines on SIGHUP or "
+        "/admin/reload, with any of the keys vad_type, vad_args, asr_type, "
+        "asr_args and transcriber_url",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to wait for in-flight utterances when shutting down or "
+        "releasing reloaded pipelines",
+    )
     parser.add_argument(
         "--host",
         type=str,
@@ -79,26 +190,134 @@ def main():
     try:
         vad_args = json.loads(args.vad_args)
         asr_args = json.loads(args.asr_args)
+        scheduler_args = json.loads(args.scheduler_args)
+        queue_args = json.loads(args.queue_args)
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON arguments: {e}")
         return
 
-    vad_pipeline = VADFactory.create_vad_pipeline(args.vad_type, **vad_args)
-    asr_pipeline = ASRFactory.create_asr_pipeline(args.asr_type, **asr_args)
+    if args.trace_file:
+        if args.trace_format == "otlp":
+            exporter = tracing.OtlpFileExporter(args.trace_file)
+        else:
+            exporter = tracing.JsonLinesExporter(args.trace_file)
+        tracing.set_tracer(tracing.Tracer(exporter, args.trace_sample_rate))
 
-    server = Server(
-        vad_pipeline,
-        asr_pipeline,
-        host=args.host,
-        port=args.port,
-        sampling_rate=16000,
-        samples_width=2,
-        certfile=args.certfile,
-        keyfile=args.keyfile,
-    )
+    if args.role != "all" and args.queue_type is None:
+        print(f"--queue-type is required for the {args.role} role")
+        return
+
+    loop = asyncio.get_event_loop()
+    exit_code = 0
+
+    def exit_on_failure(task):
+        # The worker loop and the result receiver only end on errors, such
+        # as a lost queue connection; exit so that a supervisor restarts us
+        nonlocal exit_code
+        if task.cancelled() or task.exception() is None:
+            return
+        print(f"Exiting after an unrecoverable error: {task.exception()!r}")
+        exit_code = 1
+        loop.create_task(shutdown())
+
+    queue = None
+    if args.queue_type is not None:
+        if args.queue_type == "socket":
+            # The gateway holds the queue, workers connect to it
+            queue_args.setdefault("listen", args.role != "worker")
+        queue = WorkQueueFactory.create_work_queue(args.queue_type, **queue_args)
+        loop.run_until_complete(queue.start())
+
+    vad_pipeline = asr_pipeline = transcription_backend = reloader = None
+    if args.role != "gateway":
+        vad_pipeline = VADFactory.create_vad_pipeline(args.vad_type, **vad_args)
+        asr_pipeline = ASRFactory.create_asr_pipeline(args.asr_type, **asr_args)
+        if args.transcriber_url:
+            transcription_backend = Transcriber(args.transcriber_url)
+        else:
+            transcription_backend = asr_pipeline
+        vad_pipeline = ReloadablePipeline(vad_pipeline)
+        transcription_backend = ReloadablePipeline(transcription_backend)
+        if not args.transcriber_url:
+            asr_pipeline = transcription_backend
+        reloader = PipelineReloader(
+            vad_pipeline,
+            transcription_backend,
+            {
+                "vad_type": args.vad_type,
+                "vad_args": vad_args,
+                "asr_type": args.asr_type,
+                "asr_args": asr_args,
+                "transcriber_url": args.transcriber_url,
+            },
+            config_path=args.reload_config,
+            drain_timeout=args.drain_timeout,
+        )
+        loop.add_signal_handler(
+            signal.SIGHUP, lambda: loop.create_task(reload_pipelines(reloader))
+        )
+
+    worker = worker_task = None
+    if queue is not None and args.role != "gateway":
+        worker = Worker(
+            queue,
+            vad_pipeline,
+            transcription_backend,
+            max_concurrency=args.worker_concurrency,
+        )
+        worker_task = loop.create_task(worker.run())
+        worker_task.add_done_callback(exit_on_failure)
+
+    server = None
+    if args.role != "worker":
+        if queue is not None:
+            dispatcher = RemoteDispatcher(queue)
+            loop.run_until_complete(dispatcher.start())
+            dispatcher.results_task.add_done_callback(exit_on_failure)
+            vad_pipeline = RemoteVAD(dispatcher)
+            transcription_backend = RemoteTranscriber(dispatcher)
+
+        # The local pipeline has two worker processes; an HTTP service or
+        # the workers behind a queue set their own limits
+        local_asr = queue is None and not args.transcriber_url
+        scheduler_args.setdefault("max_concurrency", 2 if local_asr else None)
+        scheduler = TranscriptionScheduler(transcription_backend, **scheduler_args)
+
+        server = Server(
+            vad_pipeline,
+            asr_pipeline,
+            scheduler,
+            host=args.host,
+            port=args.port,
+            sampling_rate=16000,
+            samples_width=2,
+            certfile=args.certfile,
+            keyfile=args.keyfile,
+            session_grace_seconds=args.session_grace_seconds,
+            admin_token=args.admin_token,
+            reloader=reloader,
+        )
+        loop.run_until_complete(server.start())
+    else:
+        print(f"Worker ready to process jobs from the {args.queue_type} queue")
+
+    async def shutdown():
+        print("Shutting down")
+        if server is not None:
+            await server.shutdown(args.drain_timeout)
+        if worker is not None:
+            worker_task.cancel()
+            await worker.drain(args.drain_timeout)
+        if queue is not None:
+            await queue.close()
+        loop.stop()
+
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signal_number, lambda: loop.create_task(shutdown()))
 
-    asyncio.get_event_loop().run_until_complete(server.start())
-    asyncio.get_event_loop().run_forever()
+    loop.run_forever()
+    if exit_code:
+        raise SystemExit(exit_code)
 
 
 if __name__ == "__main__":
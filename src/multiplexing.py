@@ -0,0 +1,75 @@
+import json
+import struct
+
+MULTIPLEX_PATH = "/mux"
+
+_STREAM_ID_LENGTH = struct.Struct("!B")
+
+
+def encode_audio_frame(stream_id, audio_data):
+    """
+    Builds a binary frame carrying audio for one logical stream.
+
+    The frame is a one byte stream ID length, the UTF-8 stream ID and the raw
+    PCM audio.
+
+    Args:
+        stream_id (str): The logical stream the audio belongs to.
+        audio_data (bytes): The audio payload.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    encoded_id = stream_id.encode("utf-8")
+    return _STREAM_ID_LENGTH.pack(len(encoded_id)) + encoded_id + audio_data
+
+
+def decode_audio_frame(frame):
+    """
+    Splits a binary frame built by encode_audio_frame.
+
+    Args:
+        frame (bytes): The received frame.
+
+    Returns:
+        tuple: The stream ID and a memoryview over the audio payload.
+
+    Raises:
+        ValueError: If the frame is shorter than its header announces.
+    """
+    if len(frame) < _STREAM_ID_LENGTH.size:
+        raise ValueError("Empty multiplexed frame")
+    (id_length,) = _STREAM_ID_LENGTH.unpack_from(frame)
+    audio_start = _STREAM_ID_LENGTH.size + id_length
+    if len(frame) < audio_start:
+        raise ValueError("Truncated stream ID in multiplexed frame")
+    view = memoryview(frame)
+    stream_id = bytes(view[_STREAM_ID_LENGTH.size : audio_start]).decode("utf-8")
+    return stream_id, view[audio_start:]
+
+
+class MultiplexedStream:
+    """
+    A logical stream carried by a shared WebSocket connection.
+
+    Buffering strategies send their transcriptions through this object as if
+    it were a WebSocket; JSON messages are tagged with the stream ID before
+    being written to the shared connection.
+
+    Attributes:
+        websocket: The shared WebSocket connection.
+        stream_id (str): The ID of this logical stream.
+    """
+
+    def __init__(self, websocket, stream_id):
+        self.websocket = websocket
+        self.stream_id = stream_id
+
+    async def send(self, message):
+        if isinstance(message, str):
+            data = json.loads(message)
+            data["stream_id"] = self.stream_id
+            message = json.dumps(data)
+        else:
+            message = encode_audio_frame(self.stream_id, message)
+        await self.websocket.send(message)
@@ -0,0 +1,105 @@
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler sampling the stacks of all threads from a
+    background thread, so it can be turned on in a running server.
+
+    Attributes:
+        interval (float): Seconds between samples.
+        stacks (Counter): Number of samples per collapsed stack.
+        samples (int): Number of sampling rounds taken.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self.stopped.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+async def monitor_loop_lag(seconds, interval=0.01):
+    """
+    Measures how late the event loop wakes up a sleeping task.
+
+    Args:
+        seconds (float): How long to monitor.
+        interval (float): Requested sleep between measurements.
+
+    Returns:
+        list: The observed lags, in seconds.
+    """
+    lags = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(time.monotonic() - start - interval)
+    return lags
+
+
+async def profile(seconds, top=50):
+    """
+    Profiles the process and its event loop for a number of seconds.
+
+    Args:
+        seconds (float): How long to profile.
+        top (int): Number of most sampled stacks to report.
+
+    Returns:
+        dict: The sampled stacks, in collapsed format with their counts, and
+              event loop lag statistics in seconds.
+    """
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        lags = await monitor_loop_lag(seconds)
+    finally:
+        await asyncio.to_thread(profiler.stop)
+
+    lags.sort()
+    return {
+        "seconds": seconds,
+        "samples": profiler.samples,
+        "interval": profiler.interval,
+        "stacks": [
+            {"stack": stack, "count": count}
+            for stack, count in profiler.stacks.most_common(top)
+        ],
+        "loop_lag": {
+            "mean": statistics.fmean(lags) if lags else 0.0,
+            "p99": lags[int(len(lags) * 0.99)] if lags else 0.0,
+            "max": lags[-1] if lags else 0.0,
+        },
+    }
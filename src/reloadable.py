@@ -0,0 +1,216 @@
+import asyncio
+import json
+
+from src.asr.asr_factory import ASRFactory
+from src.transcriber.transcriber import Transcriber
+from src.vad.vad_factory import VADFactory
+
+# One second of silence at 16 kHz, 16 bit, used to warm up new pipelines
+WARMUP_AUDIO = bytes(32000)
+
+
+class PipelineGeneration:
+    """
+    A pipeline instance together with the calls still running on it.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def acquire(self):
+        self.in_flight += 1
+        self.idle.clear()
+
+    def release(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self.idle.set()
+
+
+class ReloadablePipeline:
+    """
+    A VAD pipeline or transcription backend that can be replaced while
+    calls are running.
+
+    Each call runs on the pipeline that was current when it started; after
+    swap(), new calls go to the new pipeline, and release() frees the old
+    one once its calls have finished.
+
+    Attributes:
+        generation (PipelineGeneration): The current pipeline.
+    """
+
+    def __init__(self, pipeline):
+        self.generation = PipelineGeneration(pipeline)
+
+    @property
+    def pipeline(self):
+        return self.generation.pipeline
+
+    async def call(self, method, *args):
+        generation = self.generation
+        generation.acquire()
+        try:
+            return await getattr(generation.pipeline, method)(*args)
+        finally:
+            generation.release()
+
+    async def detect_activity(self, buffer):
+        return await self.call("detect_activity", buffer)
+
+    async def transcribe(self, buffer, language=None):
+        return await self.call("transcribe", buffer, language)
+
+    def swap(self, pipeline):
+        """
+        Sends new calls to `pipeline`.
+
+        Args:
+            pipeline: The new pipeline, already warmed up.
+
+        Returns:
+            PipelineGeneration: The previous pipeline, to pass to release().
+        """
+        old = self.generation
+        self.generation = PipelineGeneration(pipeline)
+        return old
+
+    @staticmethod
+    async def release(generation, drain_timeout=None):
+        """
+        Waits for the calls running on a replaced pipeline, then releases it.
+
+        Args:
+            generation (PipelineGeneration): The replaced pipeline.
+            drain_timeout (float): Longest wait for running calls, or None.
+        """
+        try:
+            await asyncio.wait_for(generation.idle.wait(), drain_timeout)
+        except asyncio.TimeoutError:
+            print(
+                f"Releasing {type(generation.pipeline).__name__} with "
+                f"{generation.in_flight} calls still running"
+            )
+        if hasattr(generation.pipeline, "cleanup"):
+            await generation.pipeline.cleanup()
+
+
+class PipelineReloader:
+    """
+    Loads new VAD and ASR pipelines in the background and swaps them in.
+
+    The configuration is read from a JSON file with the same keys as the
+    command line options ("vad_type", "vad_args", "asr_type", "asr_args",
+    "transcriber_url"); keys missing from it keep their current value.
+
+    Attributes:
+        vad_pipeline (ReloadablePipeline): The VAD pipeline in use.
+        transcription_backend (ReloadablePipeline): The transcription
+                                                    backend in use.
+        config (dict): The configuration of the current pipelines.
+        config_path (str): The file read on each reload, or None.
+        drain_timeout (float): Longest wait for calls on old pipelines.
+    """
+
+    def __init__(
+        self,
+        vad_pipeline,
+        transcription_backend,
+        config,
+        config_path=None,
+        drain_timeout=60.0,
+    ):
+        self.vad_pipeline = vad_pipeline
+        self.transcription_backend = transcription_backend
+        self.config = config
+        self.config_path = config_path
+        self.drain_timeout = drain_timeout
+        self.lock = asyncio.Lock()
+        self.releasing = set()
+
+    def load_config(self):
+        config = dict(self.config)
+        if self.config_path:
+            with open(self.config_path) as config_file:
+                config.update(json.load(config_file))
+        return config
+
+    @staticmethod
+    def create_pipelines(config):
+        vad_pipeline = VADFactory.create_vad_pipeline(
+            config["vad_type"], **config["vad_args"]
+        )
+        if config.get("transcriber_url"):
+            transcription_backend = Transcriber(config["transcriber_url"])
+        else:
+            transcription_backend = ASRFactory.create_asr_pipeline(
+                config["asr_type"], **config["asr_args"]
+            )
+        return vad_pipeline, transcription_backend
+
+    @staticmethod
+    async def warm_up(vad_pipeline, transcription_backend):
+        """
+        Runs the new pipelines once, raising if they do not work.
+
+        Backends that report errors as empty transcripts provide a warmup()
+        method that raises them instead.
+        """
+        await vad_pipeline.detect_activity(WARMUP_AUDIO)
+        if hasattr(transcription_backend, "warmup"):
+            await transcription_backend.warmup(WARMUP_AUDIO)
+        else:
+            await transcription_backend.transcribe(WARMUP_AUDIO)
+
+    async def reload(self):
+        """
+        Loads and warms up new pipelines, then swaps them in. Calls already
+        running finish on the old pipelines, which are released afterwards.
+        """
+        async with self.lock:
+            config = await asyncio.to_thread(self.load_config)
+            print(
+                f"Loading {config['vad_type']} VAD and "
+                f"{config.get('transcriber_url') or config['asr_type']} ASR"
+            )
+            vad_pipeline, transcription_backend = await asyncio.to_thread(
+                self.create_pipelines, config
+            )
+
+            # Pay the cold start here rather than on the first utterances; a
+            # pipeline failing it is dropped and the current ones stay
+            try:
+                await self.warm_up(vad_pipeline, transcription_backend)
+            except BaseException:
+                for pipeline in (vad_pipeline, transcription_backend):
+                    if hasattr(pipeline, "cleanup"):
+                        await pipeline.cleanup()
+                raise
+
+            # Both swaps happen without yielding, so no job sees a mix
+            replaced = [
+                self.vad_pipeline.swap(vad_pipeline),
+                self.transcription_backend.swap(transcription_backend),
+            ]
+            self.config = config
+            for generation in replaced:
+                task = asyncio.create_task(
+                    ReloadablePipeline.release(generation, self.drain_timeout)
+                )
+                self.releasing.add(task)
+                task.add_done_callback(self.releasing.discard)
+            print("Switched to the new pipelines")
+
+
+async def reload_pipelines(reloader):
+    """
+    Reloads the pipelines, logging failures rather than raising them, for
+    reloads started in the background.
+    """
+    try:
+        await reloader.reload()
+    except Exception as e:
+        print(f"Reload failed: {e}")
@@ -0,0 +1,296 @@
+import asyncio
+import contextvars
+import time
+
+from src.tracing import current_trace, span
+
+
+class TranscriptionJob:
+    """
+    A transcription waiting for, or holding, a backend slot.
+
+    Attributes:
+        client_id (str): The client that submitted the job.
+        buffer (bytes): The audio to transcribe.
+        language (str): The language to request, or None to detect it.
+        priority (int): Jobs with a higher priority are dispatched first.
+        deadline (float): Monotonic time by which the job should be started.
+        start_tag (float): Virtual time at which the job starts its service.
+        finish_tag (float): Virtual time at which the job finishes its service.
+        future (asyncio.Future): Resolved with the transcription.
+        submitted_at (float): When the job was queued.
+        task (asyncio.Task): The backend call, once dispatched.
+        context (contextvars.Context): Context of the submitter, in which the
+                                       backend call runs.
+    """
+
+    def __init__(
+        self, client_id, buffer, language, priority, deadline, start_tag, finish_tag
+    ):
+        self.client_id = client_id
+        self.buffer = buffer
+        self.language = language
+        self.priority = priority
+        self.deadline = deadline
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.future = asyncio.get_running_loop().create_future()
+        self.submitted_at = time.time()
+        self.task = None
+        self.context = contextvars.copy_context()
+
+
+class TranscriptionScheduler:
+    """
+    Orders transcriptions from all clients before they reach the ASR backend.
+
+    At most `max_concurrency` jobs run on the backend at once, or any
+    number if it is None. When a slot frees up, the next job is picked by:
+
+    1. priority, set per tenant or per client config;
+    2. earliest deadline first, for jobs whose deadline is within
+       `urgency_window_seconds`. The deadline is `max_latency_seconds` after
+       the speech ended, so time already spent buffering counts;
+    3. otherwise fair queuing, in order of virtual finish time, where a job
+       costs its audio duration. Each client advances its own virtual clock,
+       so a client uploading long utterances cannot starve the others, and
+       short utterances are not queued behind long ones.
+
+    Attributes:
+        backend: The ASR backend, anything with an async
+                 transcribe(buffer, language) method.
+        max_concurrency (int): Number of jobs run on the backend at once,
+                               or None for no limit.
+        max_latency_seconds (float): Target delay between the end of speech
+                                     and the start of its transcription.
+        urgency_window_seconds (float): How close to its deadline a job must
+                                        be to be ordered by deadline.
+        tenant_priorities (dict): Priority for each tenant name.
+        bytes_per_second (int): Audio bytes per second, used to compute costs.
+        latency_ewma (float): Moving average of backend call durations.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_concurrency=2,
+        max_latency_seconds=5.0,
+        urgency_window_seconds=1.0,
+        tenant_priorities=None,
+        bytes_per_second=32000,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_latency_seconds = max_latency_seconds
+        self.urgency_window_seconds = urgency_window_seconds
+        self.tenant_priorities = tenant_priorities or {}
+        self.bytes_per_second = bytes_per_second
+        self.pending = []
+        self.running = 0
+        self.virtual_time = 0.0
+        self.client_finish_tags = {}
+        self.client_jobs = {}
+        self.latency_ewma = 0.0
+
+    def for_client(self, client_id, tenant=None, priority=None, weight=1.0):
+        """
+        Returns a transcriber that submits jobs on behalf of one client.
+
+        Args:
+            client_id (str): The client submitting the jobs.
+            tenant (str): The tenant of the client, used to look up its
+                          priority when none is given.
+            priority (int): Explicit priority, overriding the tenant's.
+            weight (float): Share of the backend relative to other clients.
+
+        Returns:
+            ScheduledTranscriber: A transcriber bound to this scheduler.
+        """
+        if priority is None:
+            priority = self.tenant_priorities.get(tenant, 0)
+        return ScheduledTranscriber(self, client_id, priority, weight)
+
+    async def transcribe(
+        self, client_id, buffer, language=None, priority=0, weight=1.0, waited=0.0
+    ):
+        """
+        Queues a transcription and waits for its result, see submit().
+
+        Returns:
+            dict: The transcription returned by the backend.
+        """
+        job = self.submit(client_id, buffer, language, priority, weight, waited)
+        return await self.wait(job)
+
+    def submit(
+        self, client_id, buffer, language=None, priority=0, weight=1.0, waited=0.0
+    ):
+        """
+        Queues a transcription.
+
+        Args:
+            client_id (str): The client submitting the job.
+            buffer (bytes): The audio to transcribe.
+            language (str): The language to request, or None to detect it.
+            priority (int): Jobs with a higher priority are dispatched first.
+            weight (float): Share of the backend relative to other clients.
+            waited (float): Seconds since the end of the speech in the buffer.
+
+        Returns:
+            TranscriptionJob: The queued job, to pass to wait().
+        """
+        cost = len(buffer) / self.bytes_per_second / weight
+        start_tag = max(self.virtual_time, self.client_finish_tags.get(client_id, 0.0))
+        finish_tag = start_tag + cost
+        self.client_finish_tags[client_id] = finish_tag
+        self.client_jobs[client_id] = self.client_jobs.get(client_id, 0) + 1
+
+        deadline = time.monotonic() - waited + self.max_latency_seconds
+        job = TranscriptionJob(
+            client_id, buffer, language, priority, deadline, start_tag, finish_tag
+        )
+        self.pending.append(job)
+        self.dispatch()
+        return job
+
+    async def wait(self, job):
+        """
+        Waits for the result of a job.
+
+        Cancelling the caller withdraws the job if it has not started yet,
+        or cancels the backend call otherwise.
+
+        Returns:
+            dict: The transcription returned by the backend.
+        """
+        client_id = job.client_id
+        try:
+            return await job.future
+        finally:
+            if job.future.cancelled():
+                self.withdraw(job)
+            # A client without jobs restarts at the virtual time, so its
+            # tag is no longer needed
+            self.client_jobs[client_id] -= 1
+            if self.client_jobs[client_id] == 0:
+                del self.client_jobs[client_id]
+                del self.client_finish_tags[client_id]
+
+    def load(self):
+        """
+        Returns how loaded the backend is: 1.0 means all slots are busy or
+        calls take as long as the latency target, above means jobs queue up.
+        Without a concurrency limit, only the latency counts.
+        """
+        queue_load = 0.0
+        if self.max_concurrency is not None:
+            queue_load = (self.running + len(self.pending)) / self.max_concurrency
+        latency_load = self.latency_ewma / self.max_latency_seconds
+        return max(queue_load, latency_load)
+
+    def promote(self, job, priority):
+        """
+        Raises the priority of a job, which takes effect if it is still
+        queued.
+        """
+        job.priority = max(job.priority, priority)
+
+    def withdraw(self, job):
+        if job in self.pending:
+            self.pending.remove(job)
+        elif job.task is not None:
+            job.task.cancel()
+
+    def next_job(self):
+        now = time.monotonic()
+
+        def key(job):
+            if job.deadline - now <= self.urgency_window_seconds:
+                return (-job.priority, 0, job.deadline)
+            return (-job.priority, 1, job.finish_tag)
+
+        job = min(self.pending, key=key)
+        self.pending.remove(job)
+        return job
+
+    def dispatch(self):
+        while self.pending and (
+            self.max_concurrency is None or self.running < self.max_concurrency
+        ):
+            job = self.next_job()
+            if job.future.done():
+                continue
+            self.running += 1
+            self.virtual_time = max(self.virtual_time, job.start_tag)
+            job.task = job.context.run(asyncio.create_task, self.run(job))
+
+    async def run(self, job):
+        start = time.monotonic()
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_span(
+                "queue", job.submitted_at, time.time(), priority=job.priority
+            )
+        try:
+            with span("asr", bytes=len(job.buffer), language=job.language):
+                result = await self.backend.transcribe(job.buffer, job.language)
+            self.latency_ewma += 0.2 * (time.monotonic() - start - self.latency_ewma)
+            if not job.future.done():
+                job.future.set_result(result)
+        except asyncio.CancelledError:
+            job.future.cancel()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self.running -= 1
+            self.dispatch()
+
+
+class ScheduledTranscriber:
+    """
+    The scheduler as seen by one client's buffering strategy.
+
+    It exposes the same transcribe() method as Transcriber, so buffering
+    strategies do not need to know whether their jobs are scheduled.
+
+    Attributes:
+        speculative_jobs (set): Speculative jobs not finished yet.
+    """
+
+    def __init__(self, scheduler, client_id, priority=0, weight=1.0):
+        self.scheduler = scheduler
+        self.client_id = client_id
+        self.priority = priority
+        self.weight = weight
+        self.speculative_jobs = set()
+
+    async def transcribe(self, buffer, language=None, waited=0.0, speculative=False):
+        # Speculative jobs may be thrown away, so they yield to real ones
+        # until promote() confirms them
+        job = self.scheduler.submit(
+            self.client_id,
+            buffer,
+            language,
+            priority=self.priority - 1 if speculative else self.priority,
+            weight=self.weight,
+            waited=waited,
+        )
+        if not speculative:
+            return await self.scheduler.wait(job)
+        self.speculative_jobs.add(job)
+        try:
+            return await self.scheduler.wait(job)
+        finally:
+            self.speculative_jobs.discard(job)
+
+    def promote(self):
+        """
+        Gives the client's speculative jobs its normal priority, once their
+        results are known to be needed.
+        """
+        for job in self.speculative_jobs:
+            self.scheduler.promote(job, self.priority)
+
+    def load(self):
+        return self.scheduler.load()
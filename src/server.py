@@ -1,13 +1,29 @@
+# isort: skip_file
+
+import asyncio
+import http
 import json
 import logging
 import ssl
-import uuid
-import http
 import time
+import urllib.parse
+import uuid
 
 import websockets
 
 from src.client import Client
+from src.multiplexing import (
+    MULTIPLEX_PATH,
+    MultiplexedStream,
+    decode_audio_frame,
+)
+from src.profiling import profile
+from src.reloadable import reload_pipelines
+from src.session_resumption import (
+    RESUMABLE_PATH,
+    SessionStore,
+    decode_sequenced_frame,
+)
 
 
 class Server:
@@ -18,30 +34,70 @@ class Server:
     and interacts with VAD and ASR pipelines for voice activity detection and
     speech recognition.
 
+    Connections to MULTIPLEX_PATH carry many logical streams, each with its
+    own Client. Binary frames are prefixed with their stream ID (see
+    src/multiplexing.py) and JSON messages carry a "stream_id" field, both
+    for config messages received and transcriptions sent.
+
+    Connections to RESUMABLE_PATH start with a {"type": "session"} message,
+    optionally carrying the "resume_token" and "last_transcript_seq" of a
+    dropped connection, and send audio frames prefixed with a sequence number
+    (see src/session_resumption.py). The client state is kept for
+    `session_grace_seconds` after a disconnection; resent frames are ignored
+    and missed transcriptions are replayed on resumption.
+
+    When an admin token is set, GET /admin/profile?token=...&seconds=N
+    starts sampling the stacks of the process and the event loop lag for N
+    seconds, and GET /admin/profile/report?token=... returns the last
+    report as JSON once done. GET /admin/reload?token=... starts loading
+    new pipelines, which are switched to without dropping connections. Admin
+    requests are answered during the WebSocket handshake, so they must
+    return well within its timeout.
+
     Attributes:
         vad_pipeline: An instance of a voice activity detection pipeline.
         asr_pipeline: An instance of an automatic speech recognition pipeline.
+        scheduler (TranscriptionScheduler): Orders transcriptions across all
+                                            clients.
         host (str): Host address of the server.
         port (int): Port on which the server listens.
         sampling_rate (int): The sampling rate of audio data in Hz.
         samples_width (int): The width of each audio sample in bits.
         connected_clients (dict): A dictionary mapping client IDs to Client
                                   objects.
+        max_streams_per_connection (int): The maximum number of logical
+                                          streams on a multiplexed connection.
+        sessions (SessionStore): Resumable sessions, by resume token.
+        ack_every_frames (int): How often received audio is acknowledged on
+                                resumable connections.
+        admin_token (str): Token required by the admin endpoints, which are
+                           disabled when it is None.
+        reloader (PipelineReloader): Reloads the pipelines, or None if they
+                                     cannot be reloaded.
+        draining (bool): Set during a graceful shutdown; no new utterances
+                         are started.
     """
 
     def __init__(
         self,
         vad_pipeline,
         asr_pipeline,
+        scheduler,
         host="0.0.0.0",
         port=8765,
         sampling_rate=16000,
         samples_width=2,
         certfile=None,
         keyfile=None,
+        max_streams_per_connection=1024,
+        session_grace_seconds=30.0,
+        ack_every_frames=20,
+        admin_token=None,
+        reloader=None,
     ):
         self.vad_pipeline = vad_pipeline
         self.asr_pipeline = asr_pipeline
+        self.scheduler = scheduler
         self.host = host
         self.port = port
         self.sampling_rate = sampling_rate
@@ -49,6 +105,16 @@ class Server:
         self.certfile = certfile
         self.keyfile = keyfile
         self.connected_clients = {}
+        self.max_streams_per_connection = max_streams_per_connection
+        self.sessions = SessionStore(session_grace_seconds)
+        self.ack_every_frames = ack_every_frames
+        self.admin_token = admin_token
+        self.profile_task = None
+        self.profile_report = None
+        self.reloader = reloader
+        self.reload_task = None
+        self.draining = False
+        self.websocket_server = None
 
     async def handle_audio(self, client, websocket):
         while True:
@@ -65,17 +131,179 @@ class Server:
             else:
                 print(f"Unexpected message type from {client.client_id}")
 
+            if self.draining:
+                continue
+
             # this is synchronous, any async operation is in BufferingStrategy
             client.process_audio(websocket, self.vad_pipeline, self.asr_pipeline)
 
+    async def handle_resumable_audio(self, session, websocket):
+        client = session.client
+        while True:
+            message = await websocket.recv()
+
+            if isinstance(message, bytes):
+                try:
+                    seq, audio_data = decode_sequenced_frame(message)
+                except ValueError as e:
+                    print(f"Invalid frame from {client.client_id}: {e}")
+                    continue
+                if not session.accept_frame(seq):
+                    continue
+                client.append_audio_data(audio_data)
+                if session.frames_since_ack >= self.ack_every_frames:
+                    await session.ack()
+            elif isinstance(message, str):
+                config = json.loads(message)
+                if config.get("type") == "config":
+                    client.update_config(config["data"])
+                    logging.debug(f"Updated config: {client.config}")
+                    continue
+            else:
+                print(f"Unexpected message type from {client.client_id}")
+
+            if self.draining:
+                continue
+
+            # this is synchronous, any async operation is in BufferingStrategy
+            client.process_audio(session, self.vad_pipeline, self.asr_pipeline)
+
+    async def handle_multiplexed_audio(self, connection_id, websocket, streams):
+        while True:
+            message = await websocket.recv()
+
+            if isinstance(message, bytes):
+                try:
+                    stream_id, audio_data = decode_audio_frame(message)
+                except ValueError as e:
+                    print(f"Invalid frame from {connection_id}: {e}")
+                    continue
+                client, stream = self.open_stream(
+                    connection_id, websocket, streams, stream_id
+                )
+                if client is None:
+                    continue
+                client.append_audio_data(audio_data)
+            elif isinstance(message, str):
+                data = json.loads(message)
+                stream_id = data.get("stream_id")
+                # Binary frames carry string IDs, so other types would open
+                # a second stream under the same client ID
+                if not isinstance(stream_id, str):
+                    print(f"Message without a string stream_id from {connection_id}")
+                    continue
+                if data.get("type") == "close":
+                    self.close_stream(connection_id, streams, stream_id)
+                    continue
+                client, stream = self.open_stream(
+                    connection_id, websocket, streams, stream_id
+                )
+                if client is None:
+                    continue
+                if data.get("type") == "config":
+                    client.update_config(data["data"])
+                    logging.debug(
+                        f"Updated config of {client.client_id}: {client.config}"
+                    )
+                    continue
+            else:
+                print(f"Unexpected message type from {connection_id}")
+                continue
+
+            if self.draining:
+                continue
+
+            # this is synchronous, any async operation is in BufferingStrategy
+            client.process_audio(stream, self.vad_pipeline, self.asr_pipeline)
+
+    def open_stream(self, connection_id, websocket, streams, stream_id):
+        if stream_id in streams:
+            return streams[stream_id]
+        if len(streams) >= self.max_streams_per_connection:
+            print(f"Too many streams on {connection_id}, ignoring {stream_id}")
+            return None, None
+
+        client_id = f"{connection_id}/{stream_id}"
+        client = Client(
+            client_id, self.sampling_rate, self.samples_width, self.scheduler
+        )
+        self.connected_clients[client_id] = client
+        streams[stream_id] = (client, MultiplexedStream(websocket, stream_id))
+        print(f"Stream {client_id} opened")
+        return streams[stream_id]
+
+    def close_stream(self, connection_id, streams, stream_id):
+        if streams.pop(stream_id, None) is None:
+            return
+        client = self.connected_clients.pop(f"{connection_id}/{stream_id}", None)
+        if client is not None:
+            client.close()
+        print(f"Stream {connection_id}/{stream_id} closed")
+
     async def health_check(self, path, request_headers):
         if path == "/health":
             print(f"Healthcheck OK")
             return http.HTTPStatus.OK, [], b"OK\n"
+        if path.startswith("/admin/"):
+            return await self.handle_admin(path)
+
+    async def handle_admin(self, path):
+        url = urllib.parse.urlsplit(path)
+        query = urllib.parse.parse_qs(url.query)
+        if self.admin_token is None or query.get("token") != [self.admin_token]:
+            return http.HTTPStatus.FORBIDDEN, [], b"Forbidden\n"
+
+        if url.path == "/admin/profile":
+            try:
+                seconds = min(float(query.get("seconds", ["10"])[0]), 300.0)
+            except ValueError:
+                return http.HTTPStatus.BAD_REQUEST, [], b"Invalid seconds\n"
+            if self.profile_task is not None and not self.profile_task.done():
+                return http.HTTPStatus.CONFLICT, [], b"Already profiling\n"
+            self.profile_task = asyncio.create_task(self.run_profile(seconds))
+            return (
+                http.HTTPStatus.ACCEPTED,
+                [],
+                f"Profiling for {seconds} seconds, the report will be at "
+                f"/admin/profile/report\n".encode("utf-8"),
+            )
+
+        if url.path == "/admin/profile/report":
+            if self.profile_task is not None and not self.profile_task.done():
+                return http.HTTPStatus.ACCEPTED, [], b"Still profiling\n"
+            if self.profile_report is None:
+                return http.HTTPStatus.NOT_FOUND, [], b"No profile taken\n"
+            return (
+                http.HTTPStatus.OK,
+                [("Content-Type", "application/json")],
+                json.dumps(self.profile_report).encode("utf-8"),
+            )
+
+        if url.path == "/admin/reload" and self.reloader is not None:
+            # Loading models outlasts the handshake timeout, which would
+            # cancel the reload halfway
+            if self.reload_task is not None and not self.reload_task.done():
+                return http.HTTPStatus.CONFLICT, [], b"Already reloading\n"
+            self.reload_task = asyncio.create_task(reload_pipelines(self.reloader))
+            return http.HTTPStatus.ACCEPTED, [], b"Reloading\n"
+
+        return http.HTTPStatus.NOT_FOUND, [], b"Not found\n"
+
+    async def run_profile(self, seconds):
+        self.profile_report = await profile(seconds)
 
     async def handle_websocket(self, websocket):
+        if websocket.path == MULTIPLEX_PATH:
+            await self.handle_multiplexed_websocket(websocket)
+            return
+        if websocket.path == RESUMABLE_PATH:
+            await self.handle_resumable_websocket(websocket)
+            return
+
         client_id = str(uuid.uuid4())
-        client = Client(client_id, self.sampling_rate, self.samples_width)
+        client = Client(
+            client_id, self.sampling_rate, self.samples_width, self.scheduler
+        )
         self.connected_clients[client_id] = client
 
         print(f"Client {client_id} connected")
@@ -86,15 +314,97 @@ class Server:
             print(f"Connection with {client_id} closed: {e}")
         finally:
             del self.connected_clients[client_id]
+            client.close()
+
+    async def handle_multiplexed_websocket(self, websocket):
+        connection_id = str(uuid.uuid4())
+        streams = {}
 
-    def start(self):
+        print(f"Multiplexed connection {connection_id} connected")
+
+        try:
+            await self.handle_multiplexed_audio(connection_id, websocket, streams)
+        except websockets.ConnectionClosed as e:
+            print(f"Multiplexed connection {connection_id} closed: {e}")
+        finally:
+            for stream_id in list(streams):
+                self.close_stream(connection_id, streams, stream_id)
+
+    async def handle_resumable_websocket(self, websocket):
+        try:
+            hello = json.loads(await websocket.recv())
+        except websockets.ConnectionClosed:
+            return
+        except (ValueError, TypeError):
+            await websocket.close(reason="Expected a JSON session message")
+            return
+        if not isinstance(hello, dict) or hello.get("type") != "session":
+            await websocket.close(reason="Expected a session message")
+            return
+
+        session = None
+        if hello.get("resume_token"):
+            session = self.sessions.resume(hello["resume_token"])
+        resumed = session is not None
+        if not resumed:
+            client_id = str(uuid.uuid4())
+            client = Client(
+                client_id, self.sampling_rate, self.samples_width, self.scheduler
+            )
+            self.connected_clients[client_id] = client
+            session = self.sessions.create(client)
+        client_id = session.client.client_id
+
+        print(f"Client {client_id} {'resumed' if resumed else 'connected'}")
+
+        try:
+            await session.attach(
+                websocket, hello.get("last_transcript_seq", 0), resumed
+            )
+            await self.handle_resumable_audio(session, websocket)
+        except websockets.ConnectionClosed as e:
+            print(f"Connection with {client_id} closed: {e}")
+        finally:
+            # A newer connection may already have resumed the session
+            if session.websocket is websocket:
+                self.sessions.detach(session, self.expire_session)
+
+    def expire_session(self, session):
+        client_id = session.client.client_id
+        del self.connected_clients[client_id]
+        session.client.close()
+        print(f"Session of {client_id} expired")
+
+    async def start(self):
         print(
             f"WebSocket server ready to accept secure connections on "
             f"{self.host}:{self.port}"
         )
-        return websockets.serve(
+        self.websocket_server = await websockets.serve(
             self.handle_websocket,
             self.host,
             self.port,
             process_request=self.health_check,
         )
+        return self.websocket_server
+
+    async def shutdown(self, timeout=30.0):
+        """
+        Stops accepting connections, lets the utterances being processed
+        finish and send their transcriptions, then closes the connections.
+
+        Args:
+            timeout (float): Longest wait for in-flight utterances.
+        """
+        self.draining = True
+        self.websocket_server.server.close()
+
+        tasks = set()
+        for client in self.connected_clients.values():
+            tasks |= client.pending_tasks()
+        if tasks:
+            print(f"Waiting for {len(tasks)} utterances to finish")
+            await asyncio.wait(tasks, timeout=timeout)
+
+        self.websocket_server.close()
+        await self.websocket_server.wait_closed()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import secrets
+import struct
+from collections import deque
+
+import websockets
+
+RESUMABLE_PATH = "/session"
+
+_SEQUENCE_NUMBER = struct.Struct("!Q")
+
+
+def encode_sequenced_frame(seq, audio_data):
+    """
+    Builds a binary frame carrying audio with its sequence number.
+
+    Args:
+        seq (int): The sequence number of the frame, starting at 1.
+        audio_data (bytes): The audio payload.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    return _SEQUENCE_NUMBER.pack(seq) + audio_data
+
+
+def decode_sequenced_frame(frame):
+    """
+    Splits a binary frame built by encode_sequenced_frame.
+
+    Args:
+        frame (bytes): The received frame.
+
+    Returns:
+        tuple: The sequence number and a memoryview over the audio payload.
+
+    Raises:
+        ValueError: If the frame is too short to hold a sequence number.
+    """
+    if len(frame) < _SEQUENCE_NUMBER.size:
+        raise ValueError("Frame too short for a sequence number")
+    (seq,) = _SEQUENCE_NUMBER.unpack_from(frame)
+    return seq, memoryview(frame)[_SEQUENCE_NUMBER.size :]
+
+
+class ResumableSession:
+    """
+    A client session that outlives its WebSocket connection.
+
+    Buffering strategies send transcriptions through this object as if it
+    were a WebSocket. Each transcription gets a "transcript_seq" number and
+    is retained, so that it can be replayed to a reconnecting client that
+    did not receive it. While no connection is attached, transcriptions are
+    only retained.
+
+    Attributes:
+        token (str): The secret the client presents to resume the session.
+        client (Client): The client state, kept across reconnections.
+        websocket: The attached WebSocket connection, or None.
+        last_audio_seq (int): Sequence number of the last audio frame
+                              received; older frames are duplicates.
+        transcript_seq (int): Sequence number of the last transcription.
+        transcripts (deque): Recent transcriptions, for replay.
+        frames_since_ack (int): Frames received since the last ack.
+        expiry (asyncio.TimerHandle): Scheduled expiry while detached.
+    """
+
+    def __init__(self, token, client, max_retained_transcripts=256):
+        self.token = token
+        self.client = client
+        self.websocket = None
+        self.last_audio_seq = 0
+        self.transcript_seq = 0
+        self.transcripts = deque(maxlen=max_retained_transcripts)
+        self.frames_since_ack = 0
+        self.expiry = None
+
+    def accept_frame(self, seq):
+        """
+        Returns whether an audio frame is new, recording it if so. Frames
+        resent after a reconnection are rejected.
+        """
+        if seq <= self.last_audio_seq:
+            return False
+        if seq > self.last_audio_seq + 1:
+            print(
+                f"Session {self.client.client_id} lost frames "
+                f"{self.last_audio_seq + 1} to {seq - 1}"
+            )
+        self.last_audio_seq = seq
+        self.frames_since_ack += 1
+        return True
+
+    async def send(self, message):
+        data = json.loads(message)
+        self.transcript_seq += 1
+        data["transcript_seq"] = self.transcript_seq
+        message = json.dumps(data)
+        self.transcripts.append((self.transcript_seq, message))
+        await self.send_to_attached(message)
+
+    async def send_to_attached(self, message):
+        if self.websocket is None:
+            return
+        try:
+            await self.websocket.send(message)
+        except websockets.ConnectionClosed:
+            # Retained above, replayed when the client resumes
+            pass
+
+    async def ack(self):
+        self.frames_since_ack = 0
+        await self.send_to_attached(
+            json.dumps({"type": "ack", "audio_seq": self.last_audio_seq})
+        )
+
+    async def attach(self, websocket, last_transcript_seq=0, resumed=False):
+        """
+        Binds a connection to the session, telling the client where to
+        resume its audio from and replaying the transcriptions it missed.
+
+        Args:
+            websocket: The new WebSocket connection.
+            last_transcript_seq (int): Last transcription the client got.
+            resumed (bool): Whether this is a reconnection.
+        """
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        self.websocket = websocket
+        self.frames_since_ack = 0
+        await websocket.send(
+            json.dumps(
+                {
+                    "type": "session",
+                    "resume_token": self.token,
+                    "resumed": resumed,
+                    "audio_seq": self.last_audio_seq,
+                }
+            )
+        )
+        for seq, message in list(self.transcripts):
+            if seq > last_transcript_seq:
+                await websocket.send(message)
+
+
+class SessionStore:
+    """
+    Keeps resumable sessions, and the state of their clients, for a grace
+    period after their connection drops.
+
+    Attributes:
+        grace_seconds (float): How long a detached session can be resumed.
+        max_retained_transcripts (int): Transcriptions kept per session.
+        sessions (dict): Sessions by resume token.
+    """
+
+    def __init__(self, grace_seconds=30.0, max_retained_transcripts=256):
+        self.grace_seconds = grace_seconds
+        self.max_retained_transcripts = max_retained_transcripts
+        self.sessions = {}
+
+    def create(self, client):
+        token = secrets.token_urlsafe(24)
+        session = ResumableSession(token, client, self.max_retained_transcripts)
+        self.sessions[token] = session
+        return session
+
+    def resume(self, token):
+        return self.sessions.get(token)
+
+    def detach(self, session, on_expire):
+        """
+        Marks a session as disconnected and schedules its expiry.
+
+        Args:
+            session (ResumableSession): The session whose connection closed.
+            on_expire (callable): Called with the session once the grace
+                                  period ends without a reconnection.
+        """
+        session.websocket = None
+
+        def expire():
+            del self.sessions[session.token]
+            on_expire(session)
+
+        session.expiry = asyncio.get_running_loop().call_later(
+            self.grace_seconds, expire
+        )
@@ -0,0 +1,202 @@
+import contextlib
+import contextvars
+import json
+import random
+import secrets
+import time
+
+# Trace of the utterance the current task works on, None when not sampled
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+_tracer = None
+
+
+class Span:
+    """
+    A timed step in the processing of an utterance.
+
+    Attributes:
+        name (str): The step, e.g. "vad", "queue", "asr" or "send".
+        start (float): Start time, in seconds since the epoch.
+        end (float): End time, in seconds since the epoch.
+        attributes (dict): Additional details about the step.
+    """
+
+    def __init__(self, name, start, end, attributes):
+        self.span_id = secrets.token_hex(8)
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attributes = attributes
+
+
+class Trace:
+    """
+    The spans recorded for one utterance.
+
+    Attributes:
+        trace_id (str): Random 128-bit ID, hex encoded.
+        client_id (str): The client the utterance belongs to.
+        start (float): Creation time, in seconds since the epoch.
+        spans (list): The recorded spans.
+    """
+
+    def __init__(self, client_id):
+        self.trace_id = secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.client_id = client_id
+        self.start = time.time()
+        self.spans = []
+
+    def add_span(self, name, start, end, **attributes):
+        self.spans.append(Span(name, start, end, attributes))
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "client_id": self.client_id,
+            "start": self.start,
+            "end": time.time(),
+            "spans": [
+                {
+                    "name": span.name,
+                    "start": span.start,
+                    "end": span.end,
+                    "duration": span.end - span.start,
+                    **span.attributes,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Records the enclosed code as a span of the current trace, if any.
+    """
+    trace = current_trace.get()
+    start = time.time()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add_span(name, start, time.time(), **attributes)
+
+
+class JsonLinesExporter:
+    """
+    Appends each trace as one JSON object per line to a file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a", buffering=1)
+
+    def export(self, trace):
+        self.file.write(json.dumps(trace.to_dict()) + "\n")
+
+
+class OtlpFileExporter:
+    """
+    Appends each trace as one OTLP/JSON ExportTraceServiceRequest per line
+    to a file, the format of the OpenTelemetry collector's file exporter.
+    """
+
+    def __init__(self, path, service_name="voicestreamai"):
+        self.file = open(path, "a", buffering=1)
+        self.service_name = service_name
+
+    @staticmethod
+    def attributes(values):
+        return [
+            {"key": key, "value": {"stringValue": str(value)}}
+            for key, value in values.items()
+        ]
+
+    def export(self, trace):
+        end = time.time()
+        spans = [
+            {
+                "traceId": trace.trace_id,
+                "spanId": trace.span_id,
+                "name": "utterance",
+                "kind": 1,
+                "startTimeUnixNano": str(int(trace.start * 1e9)),
+                "endTimeUnixNano": str(int(end * 1e9)),
+                "attributes": self.attributes({"client_id": trace.client_id}),
+            }
+        ]
+        for span in trace.spans:
+            spans.append(
+                {
+                    "traceId": trace.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": trace.span_id,
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(int(span.start * 1e9)),
+                    "endTimeUnixNano": str(int(span.end * 1e9)),
+                    "attributes": self.attributes(span.attributes),
+                }
+            )
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": self.attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [{"scope": {"name": "src.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        self.file.write(json.dumps(request) + "\n")
+
+
+class Tracer:
+    """
+    Samples utterances to trace and exports their traces once done.
+
+    Attributes:
+        exporter: Writes finished traces, see JsonLinesExporter and
+                  OtlpFileExporter.
+        sample_rate (float): Fraction of utterances traced.
+    """
+
+    def __init__(self, exporter, sample_rate=1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start_trace(self, client_id):
+        if random.random() >= self.sample_rate:
+            return None
+        return Trace(client_id)
+
+    def finish(self, trace):
+        try:
+            self.exporter.export(trace)
+        except OSError as e:
+            print(f"Failed to export trace {trace.trace_id}: {e}")
+
+
+def set_tracer(tracer):
+    """
+    Installs the tracer used for all utterances, or None to disable tracing.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def start_trace(client_id):
+    """
+    Returns a new trace for an utterance, or None if it is not sampled.
+    """
+    if _tracer is None:
+        return None
+    return _tracer.start_trace(client_id)
+
+
+def finish_trace(trace):
+    if trace is not None and _tracer is not None:
+        _tracer.finish(trace)
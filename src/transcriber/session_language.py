@@ -0,0 +1,105 @@
+from src.asr.language_codes import language_codes
+
+
+class SessionLanguage:
+    """
+    Decides which language to request from the ASR backend for a session.
+
+    When the client configured a language it is always used. Otherwise the
+    language detected on the first utterances is pinned once it has been
+    reported with high confidence several times in a row, so that later
+    utterances skip language detection. Every `recheck_every` utterances
+    detection runs again to notice when the speaker switched language; only
+    utterances whose transcription was observed count, so that cancelled
+    speculative jobs do not use up the recheck.
+
+    Attributes:
+        configured (str): Language set in the client config, or None.
+        pinned (str): Language cached from detection, or None.
+    """
+
+    def __init__(
+        self,
+        configured=None,
+        min_probability=0.9,
+        confirmations=2,
+        recheck_every=20,
+    ):
+        self.configured = self.normalize(configured)
+        self.min_probability = min_probability
+        self.confirmations = confirmations
+        self.recheck_every = recheck_every
+        self.pinned = None
+        self.candidate = None
+        self.candidate_count = 0
+        self.utterances_since_check = 0
+
+    @staticmethod
+    def normalize(language):
+        """
+        Return the short code for a language, accepting either codes ("en")
+        or the full names some backends report ("english").
+        """
+        if not language:
+            return None
+        language = language.lower()
+        return language_codes.get(language, language)
+
+    def next_language(self):
+        """
+        Return the language to request for the next utterance, or None to
+        let the backend detect it.
+        """
+        if self.configured:
+            return self.configured
+        if self.pinned is None:
+            return None
+        if self.utterances_since_check + 1 >= self.recheck_every:
+            return None
+        return self.pinned
+
+    def observe(self, requested, transcription):
+        """
+        Record the language reported for an utterance.
+
+        Args:
+            requested (str): The language passed to the backend, as returned
+                             by next_language().
+            transcription (dict): The backend result.
+        """
+        if not transcription.get("text"):
+            return
+        if requested is not None:
+            if requested == self.pinned:
+                self.utterances_since_check += 1
+            return
+
+        language = self.normalize(transcription.get("language"))
+        probability = transcription.get("language_probability")
+        # Backends that report no probability only count as agreement
+        if language is None or (
+            probability is not None and probability < self.min_probability
+        ):
+            self.candidate = None
+            self.candidate_count = 0
+            return
+
+        if language == self.pinned:
+            # A recheck agreed
+            self.utterances_since_check = 0
+            return
+
+        # A confident recheck disagreed: detect again until confirmed
+        self.pinned = None
+
+        if language == self.candidate:
+            self.candidate_count += 1
+        else:
+            self.candidate = language
+            self.candidate_count = 1
+
+        if self.candidate_count >= self.confirmations:
+            self.pinned = language
+            self.utterances_since_check = 0
+            self.candidate = None
+            self.candidate_count = 0
@@ -6,11 +6,22 @@ class Transcriber:
     def __init__(self, url):
         self.url = url
 
-    async def transcribe(self, bytes):
+    @staticmethod
+    def form_data(bytes, language=None):
         form = aiohttp.FormData()
         form.add_field(
             "file", io.BytesIO(bytes), filename="audio.raw", content_type="audio/x-raw"
         )
+        # Only the verbose format reports the detected language; it is
+        # requested either way so that every transcript has the same shape
+        form.add_field("response_format", "verbose_json")
+        if language:
+            # A pinned language skips detection on the server side
+            form.add_field("language", language)
+        return form
+
+    async def transcribe(self, bytes, language=None):
+        form = self.form_data(bytes, language)
         async with aiohttp.ClientSession() as session:
             async with session.post(self.url, data=form) as response:
                 response.raise_for_status()
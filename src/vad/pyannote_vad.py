@@ -57,9 +57,22 @@ class PyannoteVAD(VADInterface):
         self.vad_pipeline = VoiceActivityDetection(segmentation=self.model)
         self.vad_pipeline.instantiate(pyannote_args)
 
-    async def detect_activity(self, buffer):
+    @staticmethod
+    def to_waveform(buffer):
+        """
+        Converts 16 bit PCM audio to the float waveform pyannote expects.
+
+        Args:
+            buffer (bytes): Mono 16 bit PCM audio.
+
+        Returns:
+            torch.Tensor: The samples scaled to [-1, 1], shaped (1, samples).
+        """
         data = np.frombuffer(buffer, dtype=np.int16).astype(np.float32) / 32767.0
-        waveform = torch.from_numpy(data).reshape((1, -1))
+        return torch.from_numpy(data).reshape((1, -1))
+
+    async def detect_activity(self, buffer):
+        waveform = self.to_waveform(buffer)
         audio_data = {"waveform": waveform, "sample_rate": 16000}
 
         vad_results = await asyncio.to_thread(self.vad_pipeline, audio_data)
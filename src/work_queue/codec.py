@@ -0,0 +1,46 @@
+import json
+import struct
+
+_HEADER_LENGTH = struct.Struct("!I")
+
+
+def encode_message(message):
+    """
+    Serializes a job or result for transport between processes.
+
+    The "audio" field, if any, is sent as raw bytes after a length-prefixed
+    JSON header holding the other fields.
+
+    Args:
+        message (dict): The job or result.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    header = dict(message)
+    audio = header.pop("audio", None)
+    header["has_audio"] = audio is not None
+    encoded_header = json.dumps(header).encode("utf-8")
+    return (
+        _HEADER_LENGTH.pack(len(encoded_header))
+        + encoded_header
+        + (bytes(audio) if audio is not None else b"")
+    )
+
+
+def decode_message(data):
+    """
+    Parses a message built by encode_message.
+
+    Args:
+        data (bytes): The encoded message.
+
+    Returns:
+        dict: The job or result.
+    """
+    (header_length,) = _HEADER_LENGTH.unpack_from(data)
+    audio_start = _HEADER_LENGTH.size + header_length
+    message = json.loads(data[_HEADER_LENGTH.size : audio_start])
+    if message.pop("has_audio", False):
+        message["audio"] = bytes(data[audio_start:])
+    return message
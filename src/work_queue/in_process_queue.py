@@ -0,0 +1,39 @@
+import asyncio
+from collections import defaultdict
+
+from .work_queue_interface import WorkQueueInterface
+
+
+class InProcessWorkQueue(WorkQueueInterface):
+    """
+    Work queue for a gateway and workers running in the same event loop.
+    """
+
+    def __init__(self, **kwargs):
+        self.jobs = asyncio.Queue()
+        self.results = defaultdict(asyncio.Queue)
+        self.queued = set()
+        self.withdrawn = set()
+
+    async def put_job(self, job):
+        self.queued.add(job["job_id"])
+        await self.jobs.put(job)
+
+    async def withdraw(self, job):
+        if job["job_id"] in self.queued:
+            self.withdrawn.add(job["job_id"])
+
+    async def get_job(self):
+        while True:
+            job = await self.jobs.get()
+            self.queued.discard(job["job_id"])
+            if job["job_id"] in self.withdrawn:
+                self.withdrawn.discard(job["job_id"])
+                continue
+            return job
+
+    async def put_result(self, reply_to, result):
+        await self.results[reply_to].put(result)
+
+    async def get_result(self, reply_to):
+        return await self.results[reply_to].get()
@@ -0,0 +1,137 @@
+import asyncio
+
+from .codec import decode_message, encode_message
+from .work_queue_interface import WorkQueueInterface
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server."""
+
+
+class RedisConnection:
+    """
+    A minimal RESP client, enough for the list commands used by
+    RedisWorkQueue. Any server speaking the Redis protocol can be used.
+    """
+
+    def __init__(self, host, port, password=None, db=0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.db = db
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self.execute("AUTH", self.password)
+        if self.db:
+            await self.execute("SELECT", self.db)
+
+    async def execute(self, *args):
+        command = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, (bytes, bytearray)):
+                arg = str(arg).encode("utf-8")
+            command.append(f"${len(arg)}\r\n".encode())
+            command.append(bytes(arg) + b"\r\n")
+
+        async with self.lock:
+            self.writer.write(b"".join(command))
+            await self.writer.drain()
+            return await self.read_reply()
+
+    async def read_reply(self):
+        line = await self.reader.readuntil(b"\r\n")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest.decode("utf-8")
+        if prefix == b"-":
+            raise RedisError(rest.decode("utf-8"))
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self.reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self.read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class RedisWorkQueue(WorkQueueInterface):
+    """
+    Work queue stored in Redis lists, shared by any number of gateways and
+    workers.
+
+    Jobs are pushed to "<prefix>:jobs" and results to
+    "<prefix>:results:<reply_to>". Blocking pops use their own connections
+    so that they do not hold up other commands.
+
+    Attributes:
+        host (str): Host of the Redis server.
+        port (int): Port of the Redis server.
+        prefix (str): Prefix of the keys used by the queue.
+    """
+
+    def __init__(
+        self, host="127.0.0.1", port=6379, password=None, db=0, prefix="voicestream"
+    ):
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.connections = {
+            name: RedisConnection(host, port, password, db)
+            for name in ("commands", "jobs", "results")
+        }
+
+    @property
+    def jobs_key(self):
+        return f"{self.prefix}:jobs"
+
+    def results_key(self, reply_to):
+        return f"{self.prefix}:results:{reply_to}"
+
+    async def start(self):
+        for connection in self.connections.values():
+            await connection.connect()
+
+    async def put_job(self, job):
+        await self.connections["commands"].execute(
+            "LPUSH", self.jobs_key, encode_message(job)
+        )
+
+    async def withdraw(self, job):
+        await self.connections["commands"].execute(
+            "LREM", self.jobs_key, 1, encode_message(job)
+        )
+
+    async def get_job(self):
+        _, data = await self.connections["jobs"].execute("BRPOP", self.jobs_key, 0)
+        return decode_message(data)
+
+    async def put_result(self, reply_to, result):
+        await self.connections["commands"].execute(
+            "LPUSH", self.results_key(reply_to), encode_message(result)
+        )
+
+    async def get_result(self, reply_to):
+        _, data = await self.connections["results"].execute(
+            "BRPOP", self.results_key(reply_to), 0
+        )
+        return decode_message(data)
+
+    async def close(self):
+        for connection in self.connections.values():
+            connection.close()
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+
+from src.client import current_session_id
+from src.vad.vad_interface import VADInterface
+
+
+class RemoteDispatcher:
+    """
+    Submits VAD and ASR jobs to workers through a work queue and routes
+    their results back to the waiting caller.
+
+    Pending jobs are grouped by session ID, the ID of the Client that
+    submitted them; results for a session that has gone away are dropped.
+    When the connection to the queue is lost, pending and later jobs fail
+    with ConnectionError.
+
+    Attributes:
+        queue (WorkQueueInterface): The queue shared with the workers.
+        gateway_id (str): The channel this gateway reads results from.
+        pending (dict): Futures of pending jobs, by session and job ID.
+    """
+
+    def __init__(self, queue, gateway_id=None):
+        self.queue = queue
+        self.gateway_id = gateway_id or str(uuid.uuid4())
+        self.pending = {}
+        self.results_task = None
+
+    async def start(self):
+        self.results_task = asyncio.create_task(self.receive_results())
+
+    async def submit(self, kind, audio, **kwargs):
+        if self.results_task is not None and self.results_task.done():
+            raise ConnectionError("Not receiving results from the work queue")
+        session_id = current_session_id.get()
+        job_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(session_id, {})[job_id] = future
+
+        job = dict(
+            kwargs,
+            job_id=job_id,
+            session_id=session_id,
+            reply_to=self.gateway_id,
+            kind=kind,
+            audio=audio,
+        )
+        try:
+            await self.queue.put_job(job)
+            return await future
+        except asyncio.CancelledError:
+            await self.queue.withdraw(job)
+            raise
+        finally:
+            futures = self.pending.get(session_id, {})
+            futures.pop(job_id, None)
+            if not futures:
+                self.pending.pop(session_id, None)
+
+    async def receive_results(self):
+        try:
+            while True:
+                result = await self.queue.get_result(self.gateway_id)
+                futures = self.pending.get(result["session_id"], {})
+                future = futures.get(result["job_id"])
+                if future is None or future.done():
+                    continue
+                if "error" in result:
+                    future.set_exception(RuntimeError(result["error"]))
+                else:
+                    future.set_result(result["result"])
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Lost the connection to the work queue: {e}")
+            # No result can arrive any more, so waiting jobs would hang
+            for futures in self.pending.values():
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(
+                            ConnectionError("Lost the connection to the work queue")
+                        )
+            raise
+
+
+class RemoteVAD(VADInterface):
+    """
+    VAD pipeline running on a worker.
+    """
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    async def detect_activity(self, buffer):
+        return await self.dispatcher.submit("vad", bytes(buffer))
+
+
+class RemoteTranscriber:
+    """
+    Transcription backend running on a worker.
+    """
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    async def transcribe(self, buffer, language=None):
+        return await self.dispatcher.submit(
+            "transcribe", bytes(buffer), language=language
+        )
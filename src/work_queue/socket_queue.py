@@ -0,0 +1,152 @@
+import asyncio
+import struct
+from collections import defaultdict
+
+from .codec import decode_message, encode_message
+from .work_queue_interface import WorkQueueInterface
+
+_FRAME_HEADER = struct.Struct("!IB")
+
+FRAME_READY = 0
+FRAME_JOB = 1
+FRAME_RESULT = 2
+
+
+async def read_frame(reader):
+    header = await reader.readexactly(_FRAME_HEADER.size)
+    length, frame_type = _FRAME_HEADER.unpack(header)
+    payload = await reader.readexactly(length)
+    return frame_type, decode_message(payload) if payload else None
+
+
+def write_frame(writer, frame_type, message=None):
+    payload = encode_message(message) if message is not None else b""
+    writer.write(_FRAME_HEADER.pack(len(payload), frame_type) + payload)
+
+
+class SocketWorkQueue(WorkQueueInterface):
+    """
+    Work queue over a local TCP or Unix socket, without an external broker.
+
+    The gateway listens and holds the queued jobs; workers connect, ask for
+    one job at a time and send their results back over the same connection.
+    Jobs handed to a worker that disconnects before answering are queued
+    again. A worker running in the listening process, as with the "all"
+    role, takes jobs from the queue directly.
+
+    Attributes:
+        host (str): Host to listen on or connect to.
+        port (int): Port to listen on or connect to.
+        path (str): Unix socket path, used instead of host and port if set.
+        listen (bool): True on the gateway, False on workers.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8766, path=None, listen=True, **kwargs):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.listen = listen
+        self.jobs = asyncio.Queue()
+        self.results = defaultdict(asyncio.Queue)
+        self.queued = set()
+        self.withdrawn = set()
+        self.server = None
+        self.reader = None
+        self.writer = None
+        self.read_lock = asyncio.Lock()
+        self.write_lock = asyncio.Lock()
+
+    async def start(self):
+        if self.listen:
+            if self.path:
+                self.server = await asyncio.start_unix_server(
+                    self.handle_worker, self.path
+                )
+            else:
+                self.server = await asyncio.start_server(
+                    self.handle_worker, self.host, self.port
+                )
+        elif self.path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+    async def handle_worker(self, reader, writer):
+        write_lock = asyncio.Lock()
+        in_flight = {}
+        senders = set()
+
+        try:
+            while True:
+                frame_type, message = await read_frame(reader)
+                if frame_type == FRAME_READY:
+                    sender = asyncio.create_task(
+                        self.send_job(writer, write_lock, in_flight)
+                    )
+                    senders.add(sender)
+                    sender.add_done_callback(senders.discard)
+                elif frame_type == FRAME_RESULT:
+                    in_flight.pop(message["job_id"], None)
+                    await self.results[message.pop("reply_to")].put(message)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Worker disconnected: {e}")
+        finally:
+            for sender in list(senders):
+                sender.cancel()
+            for job in in_flight.values():
+                await self.put_job(job)
+            writer.close()
+
+    async def next_job(self):
+        while True:
+            job = await self.jobs.get()
+            self.queued.discard(job["job_id"])
+            if job["job_id"] not in self.withdrawn:
+                return job
+            self.withdrawn.discard(job["job_id"])
+
+    async def send_job(self, writer, write_lock, in_flight):
+        job = await self.next_job()
+        in_flight[job["job_id"]] = job
+        async with write_lock:
+            write_frame(writer, FRAME_JOB, job)
+            await writer.drain()
+
+    async def put_job(self, job):
+        self.queued.add(job["job_id"])
+        await self.jobs.put(job)
+
+    async def withdraw(self, job):
+        if job["job_id"] in self.queued:
+            self.withdrawn.add(job["job_id"])
+
+    async def get_job(self):
+        if self.listen:
+            # A worker in the listening process takes jobs directly
+            return await self.next_job()
+        async with self.write_lock:
+            write_frame(self.writer, FRAME_READY)
+            await self.writer.drain()
+        async with self.read_lock:
+            frame_type, job = await read_frame(self.reader)
+        return job
+
+    async def put_result(self, reply_to, result):
+        if self.listen:
+            await self.results[reply_to].put(result)
+            return
+        async with self.write_lock:
+            write_frame(self.writer, FRAME_RESULT, dict(result, reply_to=reply_to))
+            await self.writer.drain()
+
+    async def get_result(self, reply_to):
+        return await self.results[reply_to].get()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,32 @@
+from .in_process_queue import InProcessWorkQueue
+from .redis_queue import RedisWorkQueue
+from .socket_queue import SocketWorkQueue
+
+
+class WorkQueueFactory:
+    """
+    Factory for creating the queues connecting gateways and workers.
+    """
+
+    @staticmethod
+    def create_work_queue(type, **kwargs):
+        """
+        Creates a work queue based on the specified type.
+
+        Args:
+            type (str): The type of work queue to create: 'in_process',
+                        'socket' or 'redis'.
+            kwargs: Additional arguments for the work queue creation.
+
+        Returns:
+            WorkQueueInterface: An instance of a class that implements
+                                WorkQueueInterface.
+        """
+        if type == "in_process":
+            return InProcessWorkQueue(**kwargs)
+        if type == "socket":
+            return SocketWorkQueue(**kwargs)
+        if type == "redis":
+            return RedisWorkQueue(**kwargs)
+        else:
+            raise ValueError(f"Unknown work queue type: {type}")
@@ -0,0 +1,72 @@
+class WorkQueueInterface:
+    """
+    Interface for the queues connecting WebSocket gateways to ASR/VAD
+    workers.
+
+    Jobs are dicts with "job_id", "session_id", "reply_to", "kind" and an
+    optional "audio" bytes field. Results are dicts with "job_id",
+    "session_id" and either "result" or "error". Each gateway reads the
+    results addressed to its own "reply_to" channel.
+    """
+
+    async def start(self):
+        """
+        Opens the connections or listeners used by the queue.
+        """
+        pass
+
+    async def put_job(self, job):
+        """
+        Enqueues a job for any worker.
+
+        Args:
+            job (dict): The job to enqueue.
+        """
+        raise NotImplementedError("This method should be implemented by subclasses.")
+
+    async def withdraw(self, job):
+        """
+        Removes a job that no worker has taken yet, because nobody waits for
+        its result anymore. Jobs already taken are left to finish.
+
+        Args:
+            job (dict): The job, as passed to put_job.
+        """
+        pass
+
+    async def get_job(self):
+        """
+        Waits for the next job. Called by workers.
+
+        Returns:
+            dict: The job.
+        """
+        raise NotImplementedError("This method should be implemented by subclasses.")
+
+    async def put_result(self, reply_to, result):
+        """
+        Sends a result back to the gateway that submitted the job.
+
+        Args:
+            reply_to (str): The channel of the gateway, taken from the job.
+            result (dict): The result.
+        """
+        raise NotImplementedError("This method should be implemented by subclasses.")
+
+    async def get_result(self, reply_to):
+        """
+        Waits for the next result addressed to a gateway.
+
+        Args:
+            reply_to (str): The channel of the gateway.
+
+        Returns:
+            dict: The result.
+        """
+        raise NotImplementedError("This method should be implemented by subclasses.")
+
+    async def close(self):
+        """
+        Releases the connections or listeners used by the queue.
+        """
+        pass
@@ -0,0 +1,66 @@
+import asyncio
+
+
+class Worker:
+    """
+    Runs VAD and ASR jobs taken from a work queue.
+
+    Attributes:
+        queue (WorkQueueInterface): The queue shared with the gateways.
+        vad_pipeline: The voice activity detection pipeline.
+        transcription_backend: The transcription backend, anything with an
+                               async transcribe(buffer, language) method.
+        max_concurrency (int): Number of jobs processed at once.
+        tasks (set): Jobs being processed.
+    """
+
+    def __init__(self, queue, vad_pipeline, transcription_backend, max_concurrency=4):
+        self.queue = queue
+        self.vad_pipeline = vad_pipeline
+        self.transcription_backend = transcription_backend
+        self.max_concurrency = max_concurrency
+        self.tasks = set()
+
+    async def run(self):
+        """
+        Takes and processes jobs until cancelled. Raises if the connection
+        to the queue is lost, so that the worker can be restarted.
+        """
+        slots = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            await slots.acquire()
+            try:
+                job = await self.queue.get_job()
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                print(f"Lost the connection to the work queue: {e}")
+                raise
+            task = asyncio.create_task(self.process_job(job))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def drain(self, timeout=None):
+        """
+        Waits for the jobs being processed, once run() has been cancelled.
+        """
+        if self.tasks:
+            await asyncio.wait(self.tasks, timeout=timeout)
+
+    async def process_job(self, job):
+        result = {"job_id": job["job_id"], "session_id": job["session_id"]}
+        try:
+            if job["kind"] == "vad":
+                result["result"] = await self.vad_pipeline.detect_activity(job["audio"])
+            elif job["kind"] == "transcribe":
+                result["result"] = await self.transcription_backend.transcribe(
+                    job["audio"], job.get("language")
+                )
+            else:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+        except Exception as e:
+            print(f"Job {job['job_id']} failed: {e}")
+            result["error"] = str(e)
+        try:
+            await self.queue.put_result(job["reply_to"], result)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Could not send the result of job {job['job_id']}: {e}")
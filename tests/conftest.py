@@ -0,0 +1,23 @@
+import pytest
+
+from tests.stubs import StubASR, StubWebSocket, create_client
+
+
+@pytest.fixture
+def asr():
+    return StubASR()
+
+
+@pytest.fixture
+def blocked_asr():
+    return StubASR(blocked=True)
+
+
+@pytest.fixture
+def websocket():
+    return StubWebSocket()
+
+
+@pytest.fixture
+def make_client():
+    return create_client
@@ -0,0 +1,73 @@
+import asyncio
+
+from src.client import Client
+from src.scheduler.transcription_scheduler import TranscriptionScheduler
+
+SAMPLING_RATE = 16000
+SAMPLES_WIDTH = 2
+
+
+class StubVAD:
+    """
+    A VAD pipeline returning fixed segments without looking at the audio.
+    """
+
+    def __init__(self, segments=None):
+        self.segments = segments or []
+
+    async def detect_activity(self, buffer):
+        return self.segments
+
+
+class StubASR:
+    """
+    A transcription backend returning a fixed transcription. When created
+    blocked, calls wait until `release` is set.
+
+    Attributes:
+        text (str): The text of every transcription.
+        buffers (list): The audio of each call.
+        release (asyncio.Event): Set when calls may return.
+    """
+
+    def __init__(self, text="hello", blocked=False):
+        self.text = text
+        self.buffers = []
+        self.release = asyncio.Event()
+        if not blocked:
+            self.release.set()
+
+    async def transcribe(self, buffer, language=None):
+        self.buffers.append(bytes(buffer))
+        await self.release.wait()
+        return {"text": self.text, "language": "en", "language_probability": 1.0}
+
+
+class StubWebSocket:
+    """
+    Collects the messages sent to a client.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+def create_client(backend=None, client_id="test", **processing_args):
+    """
+    Creates a Client scheduling its transcriptions on `backend`, a StubASR
+    by default, with the given processing args if any.
+    """
+    client = Client(
+        client_id,
+        SAMPLING_RATE,
+        SAMPLES_WIDTH,
+        TranscriptionScheduler(backend or StubASR()),
+    )
+    if processing_args:
+        processing_args.setdefault("chunk_length_seconds", 2)
+        processing_args.setdefault("chunk_offset_seconds", 0.1)
+        client.update_config({"processing_args": processing_args})
+    return client
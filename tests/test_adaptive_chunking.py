@@ -0,0 +1,41 @@
+import pytest
+
+from src.buffering_strategy.adaptive_chunking import AdaptiveChunkTuner
+
+
+def tuner():
+    return AdaptiveChunkTuner(
+        min_chunk_length_seconds=1.0,
+        max_chunk_length_seconds=4.0,
+        min_chunk_offset_seconds=0.2,
+        max_chunk_offset_seconds=1.0,
+        light_load=0.5,
+        heavy_load=2.0,
+    )
+
+
+def test_light_load_uses_the_lower_bounds():
+    assert tuner().tune(0.0) == (1.0, 0.2)
+    assert tuner().tune(0.5) == (1.0, 0.2)
+
+
+def test_heavy_load_uses_the_upper_bounds_without_pause_history():
+    assert tuner().tune(5.0) == (4.0, 1.0)
+
+
+def test_load_in_between_interpolates():
+    length, offset = tuner().tune(1.25)
+    assert length == pytest.approx(2.5)
+    assert offset == pytest.approx(0.6)
+
+
+def test_heavy_offset_follows_the_long_pauses():
+    chunk_tuner = tuner()
+    segments = [{"start": i * 1.0, "end": i * 1.0 + 0.5} for i in range(11)]
+    chunk_tuner.observe_pauses(segments)
+    assert list(chunk_tuner.pauses) == [0.5] * 10
+    assert chunk_tuner.tune(2.0) == (4.0, pytest.approx(0.5))
+
+    # Pauses beyond the upper bound are clamped to it
+    chunk_tuner.pauses.extend([5.0] * 10)
+    assert chunk_tuner.tune(2.0)[1] == 1.0
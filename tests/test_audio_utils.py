@@ -0,0 +1,46 @@
+import array
+
+import pytest
+
+from src.audio_utils import compact_speech, map_to_original
+
+# 100 Hz keeps the sample offsets easy to follow
+SAMPLING_RATE = 100
+
+
+def numbered_samples(seconds):
+    """Audio whose samples hold their own index."""
+    return array.array("h", range(int(seconds * SAMPLING_RATE))).tobytes()
+
+
+def test_compact_speech_keeps_padded_speech_and_short_pauses():
+    segments = [
+        {"start": 1.0, "end": 2.0},
+        # Within max_gap_seconds of the previous segment: merged
+        {"start": 2.3, "end": 3.0},
+        {"start": 6.0, "end": 7.0},
+    ]
+    audio, mapping = compact_speech(
+        numbered_samples(10), segments, SAMPLING_RATE, 2, 0.2, 0.5
+    )
+
+    samples = array.array("h", bytes(audio))
+    # 0.8 s to 3.2 s plus 0.5 s of the long pause, then 5.8 s to 7.2 s
+    assert list(samples) == list(range(80, 370)) + list(range(580, 720))
+    assert mapping == [(0.0, 0.8), (2.9, 5.8)]
+
+
+def test_compact_speech_clamps_padding_to_the_audio():
+    audio, mapping = compact_speech(
+        numbered_samples(1), [{"start": 0.1, "end": 0.95}], SAMPLING_RATE, 2, 0.2
+    )
+    assert len(audio) == len(numbered_samples(1))
+    assert mapping == [(0.0, 0.0)]
+
+
+def test_map_to_original_follows_the_kept_spans():
+    mapping = [(0.0, 0.8), (2.9, 5.8)]
+    assert map_to_original(1.0, mapping) == pytest.approx(1.8)
+    assert map_to_original(2.9, mapping) == pytest.approx(5.8)
+    assert map_to_original(3.0, mapping) == pytest.approx(5.9)
+    assert map_to_original(1.5, []) == 1.5
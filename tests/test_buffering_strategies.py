@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+
+from src import tracing
+from tests.stubs import StubVAD
+
+
+def test_speculation_starts_with_the_default_pause(make_client):
+    async def scenario():
+        client = make_client(speculative=True)
+        strategy = client.buffering_strategy
+        client.scratch_buffer += bytes(64000)
+
+        # 60 ms of trailing silence: the utterance goes on, but the pause is
+        # long enough to start transcribing
+        speculation = strategy.start_speculation([{"start": 0.0, "end": 1.94}], 0)
+        assert speculation is not None
+        assert await speculation.task == {
+            "text": "hello",
+            "language": "en",
+            "language_probability": 1.0,
+        }
+        client.close()
+
+    asyncio.run(scenario())
+
+
+def test_speculative_pause_longer_than_offset_falls_back(make_client):
+    async def scenario():
+        client = make_client(speculative=True, speculative_pause_seconds=0.3)
+        strategy = client.buffering_strategy
+        assert strategy.speculative_pause_seconds is None
+        assert strategy.speculative_pause() == 0.05
+        client.close()
+
+    asyncio.run(scenario())
+
+
+class ScriptedVAD:
+    """A VAD pipeline returning one result per call, then the last one."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def detect_activity(self, buffer):
+        if len(self.results) > 1:
+            return self.results.pop(0)
+        return self.results[0]
+
+
+def test_small_vad_jitter_keeps_the_speculation(make_client, asr, websocket):
+    async def scenario():
+        client = make_client(asr, speculative=True, speculative_reuse_prefix=True)
+        # The end of speech moves by 30 ms without any new speech
+        vad = ScriptedVAD(
+            [{"start": 0.0, "end": 1.95}],
+            [{"start": 0.0, "end": 1.98}],
+        )
+        client.append_audio_data(bytes(64000))
+        client.process_audio(websocket, vad, None)
+        await asyncio.sleep(0.5)
+        client.append_audio_data(bytes(32000))
+        await asyncio.gather(*client.pending_tasks())
+
+        assert all(asr.buffers)
+        assert len(asr.buffers) == 1
+        assert [json.loads(message)["text"] for message in websocket.sent] == ["hello"]
+        client.close()
+
+    asyncio.run(scenario())
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def test_receive_span_ends_when_the_chunk_is_handed_off(make_client, websocket):
+    async def scenario():
+        client = make_client()
+        client.append_audio_data(bytes(64000))
+        started_at = client.buffer_started_at
+        client.process_audio(websocket, StubVAD(), None)
+        handed_off_at = time.time()
+        # Audio arriving before the task runs starts the next buffer
+        time.sleep(0.01)
+        client.append_audio_data(bytes(320))
+        await asyncio.gather(*client.pending_tasks())
+        client.close()
+        return started_at, handed_off_at
+
+    exporter = CollectingExporter()
+    tracing.set_tracer(tracing.Tracer(exporter))
+    try:
+        started_at, handed_off_at = asyncio.run(scenario())
+    finally:
+        tracing.set_tracer(None)
+
+    [receive] = [s for s in exporter.traces[0].spans if s.name == "receive"]
+    assert receive.start == started_at
+    assert receive.end <= handed_off_at
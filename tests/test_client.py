@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from tests.stubs import StubVAD
+
+CHUNK = bytes(64000)
+
+
+class BlockingVAD:
+    """A VAD pipeline whose calls wait until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def detect_activity(self, buffer):
+        self.calls += 1
+        await self.release.wait()
+        return []
+
+
+def test_update_config_during_utterance_keeps_processing(make_client):
+    async def scenario():
+        client = make_client()
+        vad = BlockingVAD()
+        client.append_audio_data(CHUNK)
+        client.process_audio(None, vad, None)
+        await asyncio.sleep(0)
+        assert vad.calls == 1
+        assert len(client.scratch_buffer) == len(CHUNK)
+
+        client.update_config({"language": "en"})
+        await asyncio.sleep(0)
+        assert len(client.scratch_buffer) == 0
+        assert len(client.buffer) == len(CHUNK)
+
+        client.append_audio_data(bytes(320))
+        client.process_audio(None, vad, None)
+        await asyncio.sleep(0)
+        assert vad.calls == 2
+        assert client.buffering_strategy.pending_tasks()
+        client.close()
+
+    asyncio.run(scenario())
+
+
+def test_update_config_keeps_the_detected_language(make_client):
+    async def scenario():
+        client = make_client()
+        detected = {"text": "bonjour", "language": "fr", "language_probability": 0.99}
+        for _ in range(2):
+            client.language.observe(client.language.next_language(), detected)
+        assert client.language.next_language() == "fr"
+
+        client.update_config(
+            {
+                "processing_args": {
+                    "chunk_length_seconds": 3,
+                    "chunk_offset_seconds": 0.1,
+                }
+            }
+        )
+        assert client.language.next_language() == "fr"
+
+        client.update_config({"language": "en"})
+        assert client.language.next_language() == "en"
+        client.close()
+
+    asyncio.run(scenario())
+
+
+def test_update_config_during_transcription_sends_it(
+    make_client, blocked_asr, websocket
+):
+    async def scenario():
+        client = make_client(blocked_asr)
+        vad = StubVAD([{"start": 0.5, "end": 1.0}])
+        client.append_audio_data(CHUNK)
+        client.process_audio(websocket, vad, None)
+        while not blocked_asr.buffers:
+            await asyncio.sleep(0)
+
+        client.update_config({"tenant": "other"})
+        blocked_asr.release.set()
+        await asyncio.gather(*client.pending_tasks())
+        assert [json.loads(message)["text"] for message in websocket.sent] == ["hello"]
+        assert len(client.buffer) == 0
+        client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,21 @@
+import pytest
+
+from src.multiplexing import decode_audio_frame, encode_audio_frame
+
+
+def test_audio_frame_round_trip():
+    stream_id, audio = decode_audio_frame(encode_audio_frame("micro-é", b"\x01\x02"))
+    assert stream_id == "micro-é"
+    assert bytes(audio) == b"\x01\x02"
+
+
+def test_audio_frame_without_audio():
+    stream_id, audio = decode_audio_frame(encode_audio_frame("1", b""))
+    assert stream_id == "1"
+    assert len(audio) == 0
+
+
+@pytest.mark.parametrize("frame", [b"", b"\x05ab"])
+def test_short_audio_frames_are_rejected(frame):
+    with pytest.raises(ValueError):
+        decode_audio_frame(frame)
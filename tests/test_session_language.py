@@ -0,0 +1,33 @@
+from src.transcriber.session_language import SessionLanguage
+
+DETECTED = {"text": "hello", "language": "en", "language_probability": 0.99}
+
+
+def pinned_language(recheck_every):
+    language = SessionLanguage(confirmations=1, recheck_every=recheck_every)
+    language.observe(None, DETECTED)
+    assert language.pinned == "en"
+    return language
+
+
+def test_unobserved_utterances_do_not_use_up_the_recheck():
+    language = pinned_language(recheck_every=3)
+    # Speculative jobs that get cancelled ask for a language but never
+    # report a result
+    for _ in range(5):
+        assert language.next_language() == "en"
+
+    for _ in range(2):
+        requested = language.next_language()
+        language.observe(requested, DETECTED)
+    assert language.next_language() is None
+
+
+def test_agreeing_recheck_restarts_the_count():
+    language = pinned_language(recheck_every=2)
+    language.observe(language.next_language(), DETECTED)
+    assert language.next_language() is None
+
+    language.observe(None, DETECTED)
+    assert language.pinned == "en"
+    assert language.next_language() == "en"
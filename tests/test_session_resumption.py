@@ -0,0 +1,29 @@
+import types
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from src.session_resumption import ResumableSession  # noqa: E402
+
+
+def session():
+    return ResumableSession("token", types.SimpleNamespace(client_id="test"))
+
+
+def test_accept_frame_rejects_resent_frames():
+    resumable = session()
+    assert resumable.accept_frame(1)
+    assert resumable.accept_frame(2)
+    assert not resumable.accept_frame(2)
+    assert not resumable.accept_frame(1)
+    assert resumable.last_audio_seq == 2
+    assert resumable.frames_since_ack == 2
+
+
+def test_accept_frame_skips_over_lost_frames():
+    resumable = session()
+    assert resumable.accept_frame(1)
+    assert resumable.accept_frame(4)
+    assert not resumable.accept_frame(3)
+    assert resumable.last_audio_seq == 4
@@ -0,0 +1,81 @@
+import asyncio
+
+from src.scheduler.transcription_scheduler import TranscriptionScheduler
+
+
+def test_finished_clients_leave_no_state(asr):
+    async def scenario():
+        scheduler = TranscriptionScheduler(asr)
+        for i in range(100):
+            result = await scheduler.transcribe(f"client-{i}", bytes(32000))
+            assert result["text"] == "hello"
+        assert scheduler.client_finish_tags == {}
+        assert scheduler.client_jobs == {}
+
+    asyncio.run(scenario())
+
+
+def test_finish_tag_kept_while_client_has_jobs(blocked_asr):
+    async def scenario():
+        backend = blocked_asr
+        scheduler = TranscriptionScheduler(backend, max_concurrency=1)
+        first = asyncio.create_task(scheduler.transcribe("a", bytes(32000)))
+        second = asyncio.create_task(scheduler.transcribe("a", bytes(32000)))
+        await asyncio.sleep(0)
+        assert scheduler.client_jobs == {"a": 2}
+
+        second.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.client_finish_tags["a"] == 2.0
+
+        backend.release.set()
+        await first
+        assert scheduler.client_finish_tags == {}
+        assert scheduler.client_jobs == {}
+
+    asyncio.run(scenario())
+
+
+def test_promoted_speculative_job_regains_its_priority(blocked_asr):
+    async def scenario():
+        backend = blocked_asr
+        scheduler = TranscriptionScheduler(backend, max_concurrency=1)
+        order = []
+
+        async def transcribe(transcriber, speculative=False):
+            await transcriber.transcribe(bytes(32000), speculative=speculative)
+            order.append(transcriber.client_id)
+
+        blocker = asyncio.create_task(transcribe(scheduler.for_client("blocker")))
+        await asyncio.sleep(0)
+        speculating = scheduler.for_client("a")
+        tasks = [
+            asyncio.create_task(transcribe(speculating, speculative=True)),
+            asyncio.create_task(transcribe(scheduler.for_client("b"))),
+        ]
+        await asyncio.sleep(0)
+        assert [job.priority for job in speculating.speculative_jobs] == [-1]
+
+        speculating.promote()
+        backend.release.set()
+        await asyncio.gather(blocker, *tasks)
+        assert order == ["blocker", "a", "b"]
+        assert not speculating.speculative_jobs
+
+    asyncio.run(scenario())
+
+
+def test_no_concurrency_limit_runs_every_job(blocked_asr):
+    async def scenario():
+        scheduler = TranscriptionScheduler(blocked_asr, max_concurrency=None)
+        jobs = [scheduler.submit(f"client-{i}", bytes(32000)) for i in range(5)]
+        await asyncio.sleep(0)
+        assert scheduler.running == 5
+        assert scheduler.pending == []
+        assert scheduler.load() == 0.0
+
+        blocked_asr.release.set()
+        for job in jobs:
+            assert (await scheduler.wait(job))["text"] == "hello"
+
+    asyncio.run(scenario())
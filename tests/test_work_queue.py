@@ -0,0 +1,261 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+from src.work_queue.codec import decode_message, encode_message
+from src.work_queue.in_process_queue import InProcessWorkQueue
+from src.work_queue.redis_queue import RedisConnection, RedisError, RedisWorkQueue
+from src.work_queue.remote_pipelines import RemoteDispatcher
+from src.work_queue.socket_queue import SocketWorkQueue
+from src.work_queue.worker import Worker
+
+
+def job(job_id, audio=b"\x01\x02"):
+    return {
+        "job_id": job_id,
+        "session_id": "session",
+        "reply_to": "gateway",
+        "kind": "vad",
+        "audio": audio,
+    }
+
+
+def test_codec_round_trip():
+    message = job("1", audio=bytearray(b"\x00\xff" * 10))
+    assert decode_message(encode_message(message)) == dict(
+        message, audio=b"\x00\xff" * 10
+    )
+
+    result = {"job_id": "1", "session_id": "session", "result": [{"start": 0.5}]}
+    assert decode_message(encode_message(result)) == result
+
+
+def test_in_process_queue_skips_withdrawn_jobs():
+    async def scenario():
+        queue = InProcessWorkQueue()
+        await queue.put_job(job("1"))
+        await queue.put_job(job("2"))
+        await queue.withdraw(job("1"))
+        assert (await queue.get_job())["job_id"] == "2"
+        assert not queue.withdrawn
+
+    asyncio.run(scenario())
+
+
+def socket_queues(directory):
+    path = os.path.join(directory, "queue.sock")
+    return SocketWorkQueue(path=path), SocketWorkQueue(path=path, listen=False)
+
+
+def test_socket_queue_round_trip():
+    async def scenario(directory):
+        gateway, worker = socket_queues(directory)
+        await gateway.start()
+        await worker.start()
+
+        await gateway.put_job(job("1"))
+        await gateway.put_job(job("2"))
+        await gateway.withdraw(job("1"))
+        received = await asyncio.wait_for(worker.get_job(), 1)
+        assert received == job("2")
+
+        await worker.put_result("gateway", {"job_id": "2", "result": []})
+        result = await asyncio.wait_for(gateway.get_result("gateway"), 1)
+        assert result == {"job_id": "2", "result": []}
+
+        await worker.close()
+        await gateway.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+
+
+def test_socket_queue_requeues_jobs_of_disconnected_workers():
+    async def scenario(directory):
+        gateway, worker = socket_queues(directory)
+        await gateway.start()
+        await worker.start()
+
+        await gateway.put_job(job("1"))
+        assert (await asyncio.wait_for(worker.get_job(), 1))["job_id"] == "1"
+        await worker.close()
+
+        other = SocketWorkQueue(path=worker.path, listen=False)
+        await other.start()
+        assert (await asyncio.wait_for(other.get_job(), 1))["job_id"] == "1"
+
+        await other.close()
+        await gateway.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+
+
+def test_socket_queue_serves_a_worker_in_the_listening_process():
+    async def scenario(directory):
+        gateway, _ = socket_queues(directory)
+        await gateway.start()
+
+        await gateway.put_job(job("1"))
+        assert (await asyncio.wait_for(gateway.get_job(), 1)) == job("1")
+        await gateway.put_result("gateway", {"job_id": "1", "result": []})
+        result = await asyncio.wait_for(gateway.get_result("gateway"), 1)
+        assert result == {"job_id": "1", "result": []}
+
+        await gateway.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+
+
+class FakeRedis:
+    """
+    An in-memory server speaking enough RESP for RedisWorkQueue.
+    """
+
+    def __init__(self):
+        self.lists = {}
+        self.changed = asyncio.Condition()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_command(self, reader):
+        count = int((await reader.readuntil(b"\r\n"))[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    @staticmethod
+    def bulk(value):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                command, *args = await self.read_command(reader)
+                writer.write(await self.execute(command.upper(), args))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def execute(self, command, args):
+        async with self.changed:
+            if command == b"LPUSH":
+                self.lists.setdefault(args[0], []).insert(0, args[1])
+                self.changed.notify_all()
+                return b":%d\r\n" % len(self.lists[args[0]])
+            if command == b"BRPOP":
+                await self.changed.wait_for(lambda: self.lists.get(args[0]))
+                value = self.lists[args[0]].pop()
+                return b"*2\r\n" + self.bulk(args[0]) + self.bulk(value)
+            if command == b"LREM":
+                values = self.lists.get(args[0], [])
+                if args[2] in values:
+                    values.remove(args[2])
+                    return b":1\r\n"
+                return b":0\r\n"
+            if command == b"GET":
+                return b"$-1\r\n"
+            return b"-ERR unknown command\r\n"
+
+
+def test_redis_connection_parses_replies():
+    async def scenario():
+        redis = FakeRedis()
+        port = await redis.start()
+        connection = RedisConnection("127.0.0.1", port)
+        await connection.connect()
+
+        assert await connection.execute("LPUSH", "key", b"\x00value") == 1
+        assert await connection.execute("GET", "missing") is None
+        assert await connection.execute("BRPOP", "key", 0) == [b"key", b"\x00value"]
+        with pytest.raises(RedisError):
+            await connection.execute("FLUSHALL")
+
+        connection.close()
+        await redis.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_queue_round_trip_and_withdraw():
+    async def scenario():
+        redis = FakeRedis()
+        port = await redis.start()
+        queue = RedisWorkQueue(port=port, prefix="test")
+        await queue.start()
+
+        await queue.put_job(job("1"))
+        await queue.put_job(job("2"))
+        await queue.withdraw(job("1"))
+        assert (await asyncio.wait_for(queue.get_job(), 1)) == job("2")
+
+        await queue.put_result("gateway", {"job_id": "2", "result": []})
+        result = await asyncio.wait_for(queue.get_result("gateway"), 1)
+        assert result == {"job_id": "2", "result": []}
+
+        await queue.close()
+        await redis.close()
+
+    asyncio.run(scenario())
+
+
+class DisconnectingQueue(InProcessWorkQueue):
+    """
+    A queue whose connection drops once `disconnect` is set.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.disconnect = asyncio.Event()
+
+    async def get_job(self):
+        await self.disconnect.wait()
+        raise asyncio.IncompleteReadError(b"", 5)
+
+    async def get_result(self, reply_to):
+        await self.disconnect.wait()
+        raise ConnectionResetError("Connection lost")
+
+
+def test_dispatcher_fails_pending_jobs_when_the_connection_drops():
+    async def scenario():
+        queue = DisconnectingQueue()
+        dispatcher = RemoteDispatcher(queue)
+        await dispatcher.start()
+        submitted = asyncio.create_task(dispatcher.submit("vad", b"\x00\x00"))
+        await asyncio.sleep(0)
+
+        queue.disconnect.set()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(submitted, 1)
+        with pytest.raises(ConnectionResetError):
+            await dispatcher.results_task
+        with pytest.raises(ConnectionError):
+            await dispatcher.submit("vad", b"\x00\x00")
+
+    asyncio.run(scenario())
+
+
+def test_worker_stops_when_the_connection_drops():
+    async def scenario():
+        queue = DisconnectingQueue()
+        worker = Worker(queue, vad_pipeline=None, transcription_backend=None)
+        run = asyncio.create_task(worker.run())
+
+        queue.disconnect.set()
+        with pytest.raises(asyncio.IncompleteReadError):
+            await asyncio.wait_for(run, 1)
+
+    asyncio.run(scenario())